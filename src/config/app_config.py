@@ -1,29 +1,42 @@
 # -*- coding: utf-8 -*-
 
+import functools
+import hashlib
+from collections import deque
 import os
+import pickle
+import tempfile
+from types import SimpleNamespace
 from typing import Dict, Any
-from urllib.parse import urljoin
 
 import yaml
 
+# 优先使用 libyaml 的 C 加速解析器（随 PyYAML 的二进制 wheel 一起分发），
+# 解析速度约为纯 Python 实现的 5-10 倍；未编译 libyaml 时回退到纯 Python 实现
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 
 def load_yaml_file(config_path: str) -> Dict[str, Any]:
     """
     安全地加载单个 YAML 文件。如果文件未找到、为空或加载失败，则返回空字典。
-    
+
     Args:
         config_path: YAML文件路径
-        
+
     Returns:
         加载的配置字典，失败时返回空字典
     """
     if not os.path.exists(config_path):
         print(f"警告: 配置文件 '{config_path}' 未找到。")
         return {}
-    
+
     try:
-        with open(config_path, "r", encoding="utf-8") as file:
-            content = yaml.safe_load(file)
+        # 以字节方式读取，交由加载器自行解码，避免 Python 层的额外解码开销
+        with open(config_path, "rb") as file:
+            content = yaml.load(file, Loader=_YamlLoader)
             return content if content is not None else {}
     except Exception as e:
         print(f"错误: 加载 YAML 文件 '{config_path}' 失败: {e}")
@@ -32,23 +45,29 @@ def load_yaml_file(config_path: str) -> Dict[str, Any]:
 
 def _deep_merge_dicts(base_dict: Dict[str, Any], override_dict: Dict[str, Any]) -> Dict[str, Any]:
     """
-    递归地将 override_dict 合并到 base_dict 中。
+    将 override_dict 深层合并到 base_dict 中并返回 base_dict。
     对于嵌套的字典，会进行深层合并；其他类型的值，override_dict 中的会覆盖 base_dict 中的。
-    
+
+    注意：base_dict 会被就地修改。调用方（get_config）传入的都是
+    刚解析出来的一次性字典，就地合并避免了逐层拷贝的分配开销。
+
     Args:
-        base_dict: 基础配置字典
+        base_dict: 基础配置字典（会被就地修改）
         override_dict: 覆盖配置字典
-        
+
     Returns:
-        合并后的配置字典
+        合并后的配置字典（即 base_dict 本身）
     """
-    merged = base_dict.copy()
-    for key, value in override_dict.items():
-        if isinstance(value, dict) and key in merged and isinstance(merged[key], dict):
-            merged[key] = _deep_merge_dicts(merged[key], value)
-        else:
-            merged[key] = value
-    return merged
+    # 迭代式合并：用显式栈代替递归，整个过程只做指针游走，不做字典拷贝
+    stack = deque([(base_dict, override_dict)])
+    while stack:
+        dst, src = stack.popleft()
+        for key, value in src.items():
+            if isinstance(value, dict) and isinstance(dst.get(key), dict):
+                stack.append((dst[key], value))
+            else:
+                dst[key] = value
+    return base_dict
 
 
 def _build_service_urls(config: Dict[str, Any]) -> None:
@@ -64,10 +83,13 @@ def _build_service_urls(config: Dict[str, Any]) -> None:
     
     if llm_base_url:
         config['llm_server_base_url'] = llm_base_url
-        
+
+        # 直接拼接字符串即可：base_url 来自 yaml，是已知合法的前缀，
+        # 无需 urljoin 对两个 URL 做完整解析
+        llm_base = llm_base_url.rstrip('/')
         for endpoint_key, path in llm_config.get('endpoints', {}).items():
-            full_url = urljoin(llm_base_url, path.lstrip('/'))
-            
+            full_url = f"{llm_base}/{path.lstrip('/')}"
+
             if endpoint_key == 'default_generate_doc':
                 config['llm_server_url'] = full_url
             else:
@@ -78,19 +100,62 @@ def _build_service_urls(config: Dict[str, Any]) -> None:
     ai_task_base_url = ai_task_config.get('base_url')
     
     if ai_task_base_url:
+        ai_task_base = ai_task_base_url.rstrip('/')
         for endpoint_key, path in ai_task_config.get('endpoints', {}).items():
-            full_url = urljoin(ai_task_base_url, path.lstrip('/'))
-            config[f'ai_task_{endpoint_key}_url'] = full_url
+            config[f'ai_task_{endpoint_key}_url'] = f"{ai_task_base}/{path.lstrip('/')}"
     
     # 清理临时结构块
     config.pop('llm_server', None)
     config.pop('ai_task_service', None)
 
 
+def _config_cache_key(yaml_paths) -> str:
+    """
+    根据 YAML 输入文件的 (路径, mtime_ns, size) 计算缓存键。
+    任一输入文件被修改后键随之变化，旧缓存自然失效。
+    """
+    hasher = hashlib.md5()
+    for path in yaml_paths:
+        try:
+            stat = os.stat(path)
+            hasher.update(f"{path}:{stat.st_mtime_ns}:{stat.st_size};".encode("utf-8"))
+        except OSError:
+            hasher.update(f"{path}:missing;".encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def _load_cached_config(cache_path: str) -> Dict[str, Any]:
+    """尝试读取 pickle 缓存，失败时返回空字典（回退到正常解析流程）。"""
+    try:
+        with open(cache_path, "rb") as file:
+            return pickle.load(file)
+    except Exception:
+        return {}
+
+
+def _write_cached_config(cache_path: str, config: Dict[str, Any]) -> None:
+    """原子地写入 pickle 缓存，写失败不影响正常流程。"""
+    try:
+        cache_dir = os.path.dirname(cache_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            pickle.dump(config, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"警告: 写入配置缓存 '{cache_path}' 失败: {e}")
+
+
+@functools.lru_cache(maxsize=1)
 def get_config() -> Dict[str, Any]:
     """
     加载、合并并处理应用配置，生成最终的扁平化配置。
-    
+
+    结果在进程内缓存（lru_cache 单例），只在首次调用时真正解析。
+    合并后的结果还会以 pickle 形式缓存到 envs/.cache/ 下（以 YAML 文件的
+    mtime 作为键），YAML 未变化时直接反序列化缓存，跳过重复解析。
+    设置环境变量 CONFIG_CACHE_DISABLE 可在开发时关闭磁盘缓存。
+
     Returns:
         处理后的配置字典
     """
@@ -98,41 +163,89 @@ def get_config() -> Dict[str, Any]:
     current_dir = os.path.dirname(__file__)
     src_dir = os.path.dirname(current_dir)  # src 目录
     root_project_dir = os.path.dirname(src_dir)  # 项目根目录（src和envs的父目录）
-    
+
+    envs_dir = os.path.join(root_project_dir, "envs")
+    common_config_path = os.path.join(envs_dir, "config.yaml")
+
+    # 环境文件名依赖 config.yaml 中的 env 键，因此缓存键覆盖 envs 下所有
+    # YAML 文件，任何一个被修改都会使缓存失效
+    cache_enabled = not os.environ.get("CONFIG_CACHE_DISABLE")
+    cache_path = None
+    if cache_enabled:
+        try:
+            yaml_inputs = sorted(
+                os.path.join(envs_dir, name)
+                for name in os.listdir(envs_dir)
+                if name.endswith((".yaml", ".yml"))
+            )
+        except OSError:
+            yaml_inputs = [common_config_path]
+        cache_key = _config_cache_key(yaml_inputs)
+        cache_path = os.path.join(envs_dir, ".cache", f"config.{cache_key}.pkl")
+        if os.path.exists(cache_path):
+            cached_config = _load_cached_config(cache_path)
+            if cached_config:
+                return cached_config
+
     # 加载通用配置
-    common_config_path = os.path.join(root_project_dir, "envs", "config.yaml")
     common_config = load_yaml_file(common_config_path)
-    
+
     # 获取环境名称，默认为 'dev'
     env_name = common_config.get('env', 'dev')
     if not common_config.get('env'):
         print(f"警告: 'env' 键未在 'config.yaml' 中找到，使用默认值: {env_name}")
         common_config['env'] = env_name
-    
+
     # 加载环境特定配置
-    env_config_path = os.path.join(root_project_dir, "envs", f"config_{env_name}.yaml")
+    env_config_path = os.path.join(envs_dir, f"config_{env_name}.yaml")
     env_config = load_yaml_file(env_config_path)
-    
+
     # 合并配置
     merged_config = _deep_merge_dicts(common_config, env_config)
-    
+
     # 构建服务URL
     _build_service_urls(merged_config)
-    
-    return merged_config
 
+    # 缓存合并结果，下次启动时直接反序列化
+    if cache_path:
+        _write_cached_config(cache_path, merged_config)
+
+    return merged_config
 
-# 全局配置变量
-CONFIG = get_config()
 
 # 路径常量
 ROOT_PROJECT_DIR = os.path.dirname(os.path.dirname(__file__))  # 指向 src 目录
 STATIC_FILE_PATH = os.path.join(ROOT_PROJECT_DIR, 'static')
 
 
+@functools.lru_cache(maxsize=1)
+def get_cfg() -> SimpleNamespace:
+    """
+    以属性访问形式提供配置（CFG.redis_host 等）。
+
+    热点路径（如每个请求都要走的 Redis 依赖）用属性读取代替
+    dict 下标，省去每次调用的字符串哈希查找；拼错键名时直接抛
+    AttributeError，也比 dict.get 静默返回 None 更容易暴露问题。
+    """
+    return SimpleNamespace(**get_config())
+
+
+def __getattr__(name: str) -> Any:
+    """
+    PEP 562：按需提供模块级 CONFIG / CFG，避免 import 时就解析 YAML。
+    `from config.app_config import CONFIG` 的既有用法保持不变，
+    只是解析被推迟到首次真正访问 CONFIG 时。
+    """
+    if name == 'CONFIG':
+        return get_config()
+    if name == 'CFG':
+        return get_cfg()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == '__main__':
     import json
-    
+
     print(f"ROOT_PROJECT_DIR: {ROOT_PROJECT_DIR}")
     print(f"STATIC_FILE_PATH: {STATIC_FILE_PATH}")
-    print(json.dumps(CONFIG, indent=2, ensure_ascii=False))
\ No newline at end of file
+    print(json.dumps(get_config(), indent=2, ensure_ascii=False))
\ No newline at end of file
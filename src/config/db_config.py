@@ -1,12 +1,14 @@
 # -*- coding: utf-8 -*-
 
+import functools
 from urllib.parse import quote_plus as urlquote
 
 from sqlalchemy import create_engine, MetaData
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-from config.app_config import CONFIG
+from config.app_config import get_config
 from config.log_config import app_logger
 
 # 尝试导入达梦数据库模块（可选依赖）
@@ -22,6 +24,7 @@ def get_database_url():
     """
     根据配置的数据库类型构建同步数据库连接URL
     """
+    CONFIG = get_config()
     database_type = CONFIG.get('database_type', 'mysql')
     
     if database_type == 'dameng':
@@ -50,7 +53,7 @@ def get_connect_args():
     """
     获取数据库特定的连接参数
     """
-    database_type = CONFIG.get('database_type', 'mysql')
+    database_type = get_config().get('database_type', 'mysql')
     
     if database_type == 'dameng':
         return {
@@ -58,10 +61,14 @@ def get_connect_args():
             "connection_timeout": 15
         }
     else:
-        return {}
+        # pymysql 驱动级超时，配合关闭 pre_ping 后用于及时发现失效连接
+        return {
+            "read_timeout": 30,
+            "write_timeout": 30
+        }
 
 # 应用dmSQLAlchemy路径修复（仅在使用达梦数据库且模块可用时）
-if CONFIG.get('database_type') == 'dameng' and DM_AVAILABLE:
+if get_config().get('database_type') == 'dameng' and DM_AVAILABLE:
     try:
         import sys
         import types
@@ -123,32 +130,110 @@ if CONFIG.get('database_type') == 'dameng' and DM_AVAILABLE:
 DATABASE_URL = get_database_url()
 connect_args = get_connect_args()
 
+# pre_ping 每次取连接都多一次 SELECT 1 往返，默认关闭走快路径；
+# 连接失效由 get_db 捕获后整池重建。需要时可用 db_pre_ping: true 打开。
+# 池大小按单进程并发量配置：总连接数约为 workers * (pool_size + pool_max_overflow)，
+# 不要超过数据库 max_connections
+_pool_config = get_config()
 engine = create_engine(
-    DATABASE_URL, 
-    pool_size=CONFIG.get('pool_size', 10),
-    pool_pre_ping=True, 
-    pool_recycle=3600,
+    DATABASE_URL,
+    pool_size=_pool_config.get('pool_size', 10),
+    max_overflow=_pool_config.get('pool_max_overflow', 10),
+    pool_timeout=_pool_config.get('pool_timeout', 5),
+    pool_pre_ping=_pool_config.get('db_pre_ping', False),
+    pool_recycle=1800,
     connect_args=connect_args,
     echo=False
 )
 
 metadata = MetaData()
-try:
-    metadata.reflect(bind=engine)
-    app_logger.info("同步数据库表结构反射成功")
-except Exception as e:
-    app_logger.warning(f"同步数据库表结构反射失败: {e}")
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+@functools.lru_cache(maxsize=1)
+def get_metadata() -> MetaData:
+    """
+    获取已反射数据库表结构的 MetaData（懒加载）。
+
+    反射需要对数据库做一次完整的表结构往返查询，放在 import 路径上会在
+    数据库冷启动/不可达时把整个应用的导入卡住，因此推迟到首次真正需要
+    表结构信息时再执行；失败只记日志，返回未反射的 MetaData。
+    """
+    try:
+        metadata.reflect(bind=engine)
+        app_logger.info("同步数据库表结构反射成功")
+    except Exception as e:
+        app_logger.warning(f"同步数据库表结构反射失败: {e}")
+    return metadata
+
+# expire_on_commit=False：commit后不把属性置为过期，避免之后访问
+# paper.status之类的字段触发一次隐式SELECT重载
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
 def get_db():
     """
     获取数据库会话的依赖注入函数
+
+    未开启 pre_ping 时，连接失效会以 OperationalError 的形式在这里冒出；
+    此时丢弃整个连接池，下一个请求会重新建连（懒重连）。
     """
     db = SessionLocal()
     try:
         yield db
+    except OperationalError:
+        app_logger.warning("数据库连接失效，重建连接池")
+        engine.dispose()
+        raise
     finally:
         db.close()
+
+
+# ---------------------------------------------------------------------------
+# 异步数据库支持（可选，需安装 aiomysql 并在配置中开启 use_async_db）
+# 同步路径仍是默认：Service/DAO 层基于同步 Session，路由里通过线程池调用。
+# ---------------------------------------------------------------------------
+
+def get_async_database_url():
+    """
+    构建异步数据库连接URL（仅支持MySQL + aiomysql）
+    """
+    CONFIG = get_config()
+    username = CONFIG.get('username_mysql', '')
+    password = urlquote(CONFIG.get('password_mysql', ''))
+    database_uri = CONFIG.get('database_uri_mysql', '')
+    return f"mysql+aiomysql://{username}:{password}@{database_uri}"
+
+
+@functools.lru_cache(maxsize=1)
+def get_async_sessionmaker():
+    """
+    获取异步会话工厂（懒加载单例）。
+
+    达梦数据库没有异步驱动，配置为 dameng 或未开启 use_async_db 时抛出
+    RuntimeError，调用方应继续走同步路径。
+    """
+    CONFIG = get_config()
+    if CONFIG.get('database_type') == 'dameng':
+        raise RuntimeError("达梦数据库不支持异步驱动，请使用同步 Session")
+    if not CONFIG.get('use_async_db'):
+        raise RuntimeError("异步数据库未开启，请在配置中设置 use_async_db: true")
+
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        get_async_database_url(),
+        pool_size=CONFIG.get('pool_size', 10),
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        echo=False
+    )
+    return async_sessionmaker(async_engine, autocommit=False, autoflush=False)
+
+
+async def get_async_db():
+    """
+    获取异步数据库会话的依赖注入函数（需开启 use_async_db）
+    """
+    async_session = get_async_sessionmaker()
+    async with async_session() as db:
+        yield db
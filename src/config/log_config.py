@@ -20,12 +20,19 @@ logger.remove()
 if not os.path.exists(log_path):
     os.makedirs(log_path)
 # 添加控制台输出的格式,sys.stdout为输出到屏幕;关于这些配置还需要自定义请移步官网查看相关参数说明
+# 非交互终端（容器/重定向）下省去颜色标记和进程/线程字段，减少每条日志的格式化开销
+if sys.stdout.isatty():
+    _stdout_format = ("<green>{time:YYYY-MM-DD HH:mm:ss,SSS}</green> | "  # 颜色>时间
+                      "{process.name} | "  # 进程名
+                      "{thread.name} | "  # 进程名
+                      "<cyan>{module}.{function}:{line}</cyan> | "  # 模块名.方法名:行号
+                      "<level>{level}:{message}</level> ")  # 等级:日志内容
+else:
+    _stdout_format = "{time:YYYY-MM-DD HH:mm:ss,SSS} | {module}.{function}:{line} | {level}:{message}"
+
 logger.add(sys.stdout,
-                format="<green>{time:YYYY-MM-DD HH:mm:ss,SSS}</green> | "  # 颜色>时间
-                       "{process.name} | "  # 进程名
-                       "{thread.name} | "  # 进程名
-                       "<cyan>{module}.{function}:{line}</cyan> | "  # 模块名.方法名:行号
-                       "<level>{level}:{message}</level> "  # 等级:日志内容
+                format=_stdout_format,
+                level="INFO",  # 显式跳过 DEBUG 记录的格式化
                 )
 # 日志写入文件
 logger.add(os.path.join(log_path,'fast_{time:YYYY-MM-DD}.log'),  # 写入目录指定文件
@@ -34,6 +41,7 @@ logger.add(os.path.join(log_path,'fast_{time:YYYY-MM-DD}.log'),  # 写入目录
                        "{thread.name} | "  # 进程名
                        '{module}.{function}:{line} - {level} -{message}',  # 模块名.方法名:行号
                 encoding='utf-8',
+                level='INFO',
                 retention='7 days',  # 设置历史保留时长
                 backtrace=True,  # 回溯
                 diagnose=True,  # 诊断
@@ -51,20 +59,36 @@ def init_config():
         default_logger.propagate=False #禁止传播，防止日志重复记录
         default_logger.handlers = [InterceptHandler()]
 
+# levelname -> loguru级别名 的缓存：级别是固定的小集合，无需每条记录都查询
+_LEVEL_CACHE: dict = {}
+
+
 class InterceptHandler(logging.Handler):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # 标准库 logging 到 emit 的调用链深度是固定的，首次 emit 时
+        # 做一次帧游走并缓存，后续记录（如uvicorn访问日志）直接复用
+        self._depth: int = 0
+
     def emit(self, record: logging.LogRecord) -> None:
-        # 获取相应的loguru的日志级别
-        try:
-            level = logger.level(record.levelname).name
-        except ValueError:
-            level = str(record.levelno)
+        # 获取相应的loguru的日志级别（按levelname缓存）
+        level = _LEVEL_CACHE.get(record.levelname)
+        if level is None:
+            try:
+                level = logger.level(record.levelname).name
+            except ValueError:
+                level = str(record.levelno)
+            _LEVEL_CACHE[record.levelname] = level
+
         # Find caller from where originated the logged message
-        frame, depth = logging.currentframe(), 2
-        while frame.f_code.co_filename == logging.__file__:
-            frame = cast(FrameType, frame.f_back)
-            depth += 1
+        if not self._depth:
+            frame, depth = logging.currentframe(), 2
+            while frame.f_code.co_filename == logging.__file__:
+                frame = cast(FrameType, frame.f_back)
+                depth += 1
+            self._depth = depth
 
-        logger.opt(depth=depth, exception=record.exc_info).log(
+        logger.opt(depth=self._depth, exception=record.exc_info).log(
             level, record.getMessage(),
         )
 
@@ -5,12 +5,19 @@ from fastapi import Depends, HTTPException, status
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 
+from config.app_config import CONFIG
+
 router = fastapi.APIRouter()
 security = HTTPBasic()
 
+# 凭据在模块加载时一次性编码为 bytes，避免每次请求对常量重复做 UTF-8 编码；
+# 优先从配置读取，便于部署时覆盖硬编码默认值
+_DOCS_USERNAME = CONFIG.get('docs_username', 'ict').encode('utf-8')
+_DOCS_PASSWORD = CONFIG.get('docs_password', 'Admin@111111').encode('utf-8')
+
 def get_current_username(credentials: HTTPBasicCredentials = Depends(security)):
-    correct_username = secrets.compare_digest(credentials.username, 'ict')
-    correct_password = secrets.compare_digest(credentials.password, 'Admin@111111')
+    correct_username = secrets.compare_digest(credentials.username.encode('utf-8'), _DOCS_USERNAME)
+    correct_password = secrets.compare_digest(credentials.password.encode('utf-8'), _DOCS_PASSWORD)
     if not (correct_username and correct_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
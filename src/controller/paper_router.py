@@ -5,6 +5,8 @@ from typing import Dict, Any, List
 import os
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+import redis
 from redis import Redis
 from sqlalchemy.orm import Session
 
@@ -33,13 +35,21 @@ from schemas.paper_schemas import (
 from service.analyze_paper_service import analyze_paper_answers
 from service.generate_paper_service import generate_training_questions
 from utils.redis_util import PaperTestStateProcessor
-from utils.paper_utils import hide_correct_answers, build_analysis_tasks_from_cache
-from utils.file_download_util import process_file_list
+from utils.paper_utils import build_analysis_tasks_from_cache
+from utils.file_download_util import process_file_list_async
 from config.app_config import STATIC_FILE_PATH
 
 
 router = APIRouter(prefix="/paper", tags=["培训考试题目"])
 
+# 共享试题GET接口的响应级缓存：内容在TTL窗口内不变，短TTL即可大幅降低数据库QPS
+PAPER_RESPONSE_CACHE_KEY = "PAPER_RESPONSE"
+ACCESS_RESPONSE_CACHE_KEY = "ACCESS_RESPONSE"
+PAPER_RESPONSE_CACHE_TTL = 60  # 秒
+
+# 知识库目录在进程内不会变化，启动时计算一次即可
+KNOWLEDGE_DIR = os.path.join(STATIC_FILE_PATH, 'knowledge')
+
 
 @router.post("/generate", response_model=ApiSuccessResponse[GeneratePaperResponse])
 async def generate_paper(
@@ -63,17 +73,19 @@ async def generate_paper(
         paper_processor = PaperTestStateProcessor(redis_client)
 
         # 处理文件列表，确保所有文件都可用
-        knowledge_dir = os.path.join(STATIC_FILE_PATH, 'knowledge')
         if request.file_list:
-            # 将FileInfo对象转换为字典列表
-            file_dict_list = [file_info.dict() for file_info in request.file_list]
-            available_files = process_file_list(file_dict_list, knowledge_dir)
+            # 将FileInfo对象转换为字典列表：整个列表一次性交给 pydantic-core
+            # 的原生序列化器，比逐项调用 model_dump 少 N 次 Python 层进出
+            file_dict_list = request.model_dump(include={'file_list'})['file_list']
+            # 并发下载所有文件，整体延迟约等于最慢的一个文件
+            available_files = await process_file_list_async(file_dict_list, KNOWLEDGE_DIR)
         else:
             # 如果没有提供文件列表，使用默认文档
             available_files = []
 
-        # 调用service层生成试题
-        result = generate_training_questions(
+        # 调用service层生成试题（耗时的大模型调用放入线程池，避免阻塞事件循环）
+        result = await run_in_threadpool(
+            generate_training_questions,
             doc_files=available_files
         )
 
@@ -101,11 +113,15 @@ async def generate_paper(
             created_at=datetime.now().isoformat()
         )
 
-        # 保存完整数据到缓存
-        paper_processor.save_generated_paper(request.user_id, request.chat_id, cache_data.dict())
+        # 保存完整数据到缓存（model_dump_json 一次性完成 模型→JSON，省去 dict 中转）
+        paper_processor.save_generated_paper(request.user_id, request.chat_id, cache_data.model_dump_json())
 
-        # 隐藏正确答案用于前端返回
-        frontend_questions = hide_correct_answers(questions)
+        # 隐藏正确答案用于前端返回：直接用 pydantic 的 exclude 机制在
+        # 原生序列化里过滤答案字段，避免再用 Python 循环重建一遍题目列表
+        frontend_questions = [
+            question.model_dump(exclude={"options": {"__all__": {"is_correct", "explanation"}}})
+            for question in cache_data.questions
+        ]
 
         response_data = GeneratePaperResponse(
             questions=frontend_questions,
@@ -164,8 +180,8 @@ async def analyze_paper_simple(
 
         log_config.app_logger.info(f"从缓存构建分析输入，共 {len(analysis_tasks)}个题目")
 
-        # 调用service层分析试题（只调用一次大模型服务）
-        result = analyze_paper_answers(analysis_tasks=analysis_tasks)
+        # 调用service层分析试题（只调用一次大模型服务，放入线程池执行）
+        result = await run_in_threadpool(analyze_paper_answers, analysis_tasks=analysis_tasks)
 
         # 构建响应数据
         analysis_results = result.get('analysis_results', [])
@@ -220,12 +236,13 @@ async def generate_shared_paper(
     try:
         shared_paper_service = SharedPaperService(db, redis_client)
         
-        # 将FileInfo对象转换为字典列表
+        # 将FileInfo对象转换为字典列表（整列表单次序列化）
         file_list = None
         if request.file_list:
-            file_list = [file_info.dict() for file_info in request.file_list]
+            file_list = request.model_dump(include={'file_list'})['file_list']
         
-        result = shared_paper_service.generate_shared_paper(
+        result = await run_in_threadpool(
+            shared_paper_service.generate_shared_paper,
             user_id=request.user_id,
             file_list=file_list
         )
@@ -271,12 +288,26 @@ async def get_shared_paper_by_id(
         试题信息（隐藏答案）
     """
     try:
+        # 读穿缓存：短TTL内直接复用序列化好的响应，跳过数据库和隐藏答案的处理。
+        # Redis故障只记日志并落到服务层（服务层自身会降级读库），不让读接口500
+        cache_key = f"{PAPER_RESPONSE_CACHE_KEY}:{paper_id}"
+        try:
+            cached_response = await run_in_threadpool(redis_client.get, cache_key)
+        except redis.RedisError as e:
+            log_config.app_logger.warning(f"响应缓存读取失败，降级走服务层: {str(e)}")
+            cached_response = None
+        if cached_response:
+            return ApiSuccessResponse(
+                data=GetPaperResponse.model_validate_json(cached_response),
+                message="获取试题成功"
+            )
+
         shared_paper_service = SharedPaperService(db, redis_client)
-        result = shared_paper_service.get_paper_by_id(paper_id)
-        
+        result = await run_in_threadpool(shared_paper_service.get_paper_by_id, paper_id)
+
         if not result:
             raise HTTPException(status_code=404, detail="试题不存在或已失效")
-        
+
         response_data = GetPaperResponse(
             paper_id=result['paper_id'],
             access_code=result['access_code'],
@@ -286,12 +317,20 @@ async def get_shared_paper_by_id(
             documents=result.get('documents', []),
             document_count=result.get('document_count', 0)
         )
-        
+
+        try:
+            await run_in_threadpool(
+                redis_client.set, cache_key, response_data.model_dump_json(),
+                ex=PAPER_RESPONSE_CACHE_TTL
+            )
+        except redis.RedisError as e:
+            log_config.app_logger.warning(f"响应缓存写入失败（不影响返回）: {str(e)}")
+
         return ApiSuccessResponse(
             data=response_data,
             message="获取试题成功"
         )
-        
+
     except HTTPException:
         raise
     except Exception as e:
@@ -317,12 +356,25 @@ async def get_shared_paper_by_access_code(
         试题信息（隐藏答案）
     """
     try:
+        # 读穿缓存：与按ID获取共用同一套短TTL响应缓存；Redis故障降级走服务层
+        cache_key = f"{ACCESS_RESPONSE_CACHE_KEY}:{access_code}"
+        try:
+            cached_response = await run_in_threadpool(redis_client.get, cache_key)
+        except redis.RedisError as e:
+            log_config.app_logger.warning(f"响应缓存读取失败，降级走服务层: {str(e)}")
+            cached_response = None
+        if cached_response:
+            return ApiSuccessResponse(
+                data=GetPaperResponse.model_validate_json(cached_response),
+                message="获取试题成功"
+            )
+
         shared_paper_service = SharedPaperService(db, redis_client)
-        result = shared_paper_service.get_paper_by_access_code(access_code)
-        
+        result = await run_in_threadpool(shared_paper_service.get_paper_by_access_code, access_code)
+
         if not result:
             raise HTTPException(status_code=404, detail="试题不存在或访问码无效")
-        
+
         response_data = GetPaperResponse(
             paper_id=result['paper_id'],
             access_code=result['access_code'],
@@ -332,12 +384,20 @@ async def get_shared_paper_by_access_code(
             documents=result.get('documents', []),
             document_count=result.get('document_count', 0)
         )
-        
+
+        try:
+            await run_in_threadpool(
+                redis_client.set, cache_key, response_data.model_dump_json(),
+                ex=PAPER_RESPONSE_CACHE_TTL
+            )
+        except redis.RedisError as e:
+            log_config.app_logger.warning(f"响应缓存写入失败（不影响返回）: {str(e)}")
+
         return ApiSuccessResponse(
             data=response_data,
             message="获取试题成功"
         )
-        
+
     except HTTPException:
         raise
     except Exception as e:
@@ -367,10 +427,12 @@ async def submit_shared_paper_answers(
     try:
         shared_paper_service = SharedPaperService(db, redis_client)
         
-        # 将UserAnswer对象转换为字典列表
-        answers = [answer.dict() for answer in request.answers]
+        # 将UserAnswer对象转换为字典列表：单次序列化整份答卷，
+        # 得到的嵌套dict可直接落入JSON列，后续无需再做编码
+        answers = request.model_dump(include={'answers'})['answers']
         
-        result = shared_paper_service.submit_answers(
+        result = await run_in_threadpool(
+            shared_paper_service.submit_answers,
             paper_id=paper_id,
             user_id=request.user_id,
             answers=answers
@@ -421,7 +483,7 @@ async def get_shared_paper_result(
     """
     try:
         shared_paper_service = SharedPaperService(db, redis_client)
-        result = shared_paper_service.get_user_result(paper_id, user_id)
+        result = await run_in_threadpool(shared_paper_service.get_user_result, paper_id, user_id)
         
         if not result:
             raise HTTPException(status_code=404, detail="未找到该用户的答题记录")
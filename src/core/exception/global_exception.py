@@ -1,27 +1,31 @@
 import http
 
 from starlette.requests import Request
-from starlette.responses import JSONResponse
 from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
 
 from config.log_config import app_logger
 
 
+async def http_exception_handler(request: Request, exc: HTTPException):
+    # HTTPException 由 FastAPI 单独分发到这里，直接读取状态码和详情即可
+    app_logger.info(f"HTTP异常：{exc.detail}")
+    return ORJSONResponse(
+        status_code=exc.status_code,
+        content={
+            "url": request.url.path,
+            "error": "系统出现异常！"
+        }
+    )
+
+
 async def general_exception_handler(request: Request, exc: Exception):
-    # 如果是 HTTPException，提取它的 status_code 和 detail
-    if isinstance(exc, HTTPException):
-        status_code = exc.status_code
-        detail = exc.detail
-    else:
-        # 普通异常，默认返回 500
-        status_code = http.HTTPStatus.INTERNAL_SERVER_ERROR
-        detail = str(exc)
-    app_logger.info(f"通用系统异常：{detail}")
-    return JSONResponse(
-        status_code=status_code,  # 使用动态状态码
-        headers={"Access-Control-Allow-Origin": "*"},
+    # 未捕获的普通异常，默认返回 500
+    app_logger.info(f"通用系统异常：{str(exc)}")
+    return ORJSONResponse(
+        status_code=http.HTTPStatus.INTERNAL_SERVER_ERROR,
         content={
-            "url": str(request.url),
+            "url": request.url.path,
             "error": "系统出现异常！"
         }
-    )
\ No newline at end of file
+    )
@@ -1,8 +1,13 @@
+import orjson
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from starlette.responses import Response
 
 from config.log_config import app_logger
 
+# (status, code, message) -> 预序列化的响应体字节。业务异常基本是固定的
+# 几组错误码+提示语，缓存后错误路径只剩一次dict查找和写出
+_err_cache: dict = {}
+
 
 class TrainingException(Exception):
     """通用业务异常。
@@ -25,10 +30,19 @@ async def training_exception_handler(request: Request, exc: TrainingException):
     """FastAPI 异常处理器：统一返回格式并记录日志。"""
     # 记录业务异常
     app_logger.warning(f"TrainingException | code={exc.code} | message={exc.message} | url={request.url}")
-    
-    return JSONResponse(
+
+    key = (exc.status, exc.code, exc.message)
+    body = _err_cache.get(key)
+    if body is None:
+        body = orjson.dumps({"code": exc.code, "message": exc.message, "data": None})
+        # message可能含用户可控内容，封顶后整体清空防止无限增长
+        if len(_err_cache) > 1024:
+            _err_cache.clear()
+        _err_cache[key] = body
+
+    return Response(
+        content=body,
         status_code=exc.status,
-        headers={"Access-Control-Allow-Origin": "*"},
-        content={"code": exc.code, "message": exc.message, "data": None},
+        media_type="application/json",
     )
 
@@ -1,15 +1,16 @@
 from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
 from starlette.requests import Request
-from starlette.responses import JSONResponse
 
 from config.log_config import app_logger
 
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    # 打印原始错误信息
-    app_logger.info(f"Validation Error:  {exc},{request.headers}")
-    return JSONResponse(
+    errors = exc.errors()
+    # DEBUG级+延迟格式化：INFO阈值下不触发任何字符串拼接；
+    # 只记路径和错误条数，不再整包打印异常树和全部请求头
+    app_logger.debug("Validation Error: path={} errors={}", request.url.path, len(errors))
+    return ORJSONResponse(
         status_code=422,
-        content={"detail": exc.errors(), "body": exc.body},
-        headers={"Access-Control-Allow-Origin": "*"},
+        content={"detail": errors, "body": exc.body},
     )
@@ -1,14 +1,21 @@
 # -*- coding: utf-8 -*-
 """试题数据访问对象"""
 
-import json
+import time
 from typing import Optional, List, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+
+from sqlalchemy.orm import Session, undefer
+from sqlalchemy import and_, update, delete, insert
 
 from model.paper import Paper, UserAnswer
 from config.log_config import app_logger
 
+# 进程内题目缓存：题目生成后内容不可变，短TTL即可挡掉同一试卷
+# 学生端的重复DB读（多worker部署下各进程各一份，上层另有Redis缓存兜底）
+_QUESTIONS_CACHE: Dict[str, Any] = {}
+_QUESTIONS_CACHE_TTL = 300  # 秒
+_QUESTIONS_CACHE_MAX = 1024
+
 
 class PaperDao:
     """试题数据访问对象"""
@@ -29,7 +36,8 @@ class PaperDao:
         try:
             paper = Paper(
                 paper_id=paper_data['paper_id'],
-                questions=json.dumps(paper_data['questions'], ensure_ascii=False),
+                # JSON列直接存Python对象，序列化交给数据库驱动
+                questions=paper_data['questions'],
                 total_count=paper_data['total_count'],
                 access_code=paper_data['access_code'],
                 user_id=paper_data.get('user_id'),
@@ -48,6 +56,45 @@ class PaperDao:
             app_logger.error(f"创建试题失败: {str(e)}")
             raise
     
+    def create_papers_bulk(self, papers: List[Dict[str, Any]]) -> List[str]:
+        """
+        批量创建试题（单条INSERT多行，一次往返）
+
+        逐条调create_paper是N次INSERT+commit往返；批量生成场景下
+        组装好列表一次写入，往返次数与N无关。
+
+        Args:
+            papers: 试题数据字典列表，字段同create_paper
+
+        Returns:
+            创建的试题ID列表
+        """
+        if not papers:
+            return []
+        try:
+            rows = [
+                {
+                    'paper_id': p['paper_id'],
+                    'questions': p['questions'],
+                    'total_count': p['total_count'],
+                    'access_code': p['access_code'],
+                    'user_id': p.get('user_id'),
+                    'status': p.get('status', 'active')
+                }
+                for p in papers
+            ]
+            self.db.execute(insert(Paper), rows)
+            self.db.commit()
+
+            paper_ids = [row['paper_id'] for row in rows]
+            app_logger.info(f"成功批量创建试题: {len(paper_ids)} 份")
+            return paper_ids
+
+        except Exception as e:
+            self.db.rollback()
+            app_logger.error(f"批量创建试题失败: {str(e)}")
+            raise
+
     def get_paper_by_id(self, paper_id: str) -> Optional[Paper]:
         """
         根据试题ID获取试题
@@ -58,7 +105,8 @@ class PaperDao:
         Returns:
             试题对象，如果不存在则返回None
         """
-        return self.db.query(Paper).filter(Paper.paper_id == paper_id).first()
+        # 主键查询走Session.get：命中identity map时直接返回，不发SQL
+        return self.db.get(Paper, paper_id)
     
     def get_paper_by_access_code(self, access_code: str) -> Optional[Paper]:
         """
@@ -84,12 +132,30 @@ class PaperDao:
         """
         paper = self.get_paper_by_id(paper_id)
         if paper and paper.questions:
-            try:
-                return json.loads(paper.questions)
-            except json.JSONDecodeError as e:
-                app_logger.error(f"解析试题内容失败: {str(e)}")
-                return None
+            # JSON列由驱动解码，查询即得Python列表
+            return paper.questions
         return None
+
+    def get_paper_questions_cached(self, paper_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        获取试题的题目列表（带进程内TTL缓存）
+
+        Args:
+            paper_id: 试题ID
+
+        Returns:
+            题目列表，如果不存在则返回None
+        """
+        entry = _QUESTIONS_CACHE.get(paper_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+
+        questions = self.get_paper_questions(paper_id)
+        if questions:
+            if len(_QUESTIONS_CACHE) >= _QUESTIONS_CACHE_MAX:
+                _QUESTIONS_CACHE.clear()
+            _QUESTIONS_CACHE[paper_id] = (time.monotonic() + _QUESTIONS_CACHE_TTL, questions)
+        return questions
     
     def update_paper_status(self, paper_id: str, status: str) -> bool:
         """
@@ -103,10 +169,13 @@ class PaperDao:
             是否更新成功
         """
         try:
-            paper = self.get_paper_by_id(paper_id)
-            if paper:
-                paper.status = status
-                self.db.commit()
+            # 单条UPDATE直达，省去先SELECT再改属性的一次数据库往返
+            result = self.db.execute(
+                update(Paper).where(Paper.paper_id == paper_id).values(status=status)
+            )
+            self.db.commit()
+            if result.rowcount:
+                _QUESTIONS_CACHE.pop(paper_id, None)
                 app_logger.info(f"成功更新试题状态: {paper_id} -> {status}")
                 return True
             return False
@@ -126,14 +195,12 @@ class PaperDao:
             是否删除成功
         """
         try:
-            # 先删除相关答题记录
-            self.db.query(UserAnswer).filter(UserAnswer.paper_id == paper_id).delete()
-            
-            # 再删除试题
-            paper = self.get_paper_by_id(paper_id)
-            if paper:
-                self.db.delete(paper)
-                self.db.commit()
+            # 同一事务内两条批量DELETE，不再先SELECT装载ORM对象
+            self.db.execute(delete(UserAnswer).where(UserAnswer.paper_id == paper_id))
+            result = self.db.execute(delete(Paper).where(Paper.paper_id == paper_id))
+            self.db.commit()
+            _QUESTIONS_CACHE.pop(paper_id, None)
+            if result.rowcount:
                 app_logger.info(f"成功删除试题: {paper_id}")
                 return True
             return False
@@ -160,15 +227,18 @@ class UserAnswerDao:
             创建的答题记录对象
         """
         try:
+            # 绑定一次.get方法引用，省去每个可选字段的重复属性查找；
+            # JSON字段直接传对象，序列化交给驱动，这里不再有dumps链
+            get = answer_data.get
             user_answer = UserAnswer(
                 paper_id=answer_data['paper_id'],
                 user_id=answer_data['user_id'],
-                answers=json.dumps(answer_data['answers'], ensure_ascii=False) if answer_data.get('answers') else None,
-                score=answer_data.get('score'),
-                correct_count=answer_data.get('correct_count'),
-                total_count=answer_data.get('total_count'),
-                analysis_results=json.dumps(answer_data['analysis_results'], ensure_ascii=False) if answer_data.get('analysis_results') else None,
-                overall_feedback=answer_data.get('overall_feedback')
+                answers=get('answers'),
+                score=get('score'),
+                correct_count=get('correct_count'),
+                total_count=get('total_count'),
+                analysis_results=get('analysis_results'),
+                overall_feedback=get('overall_feedback')
             )
             
             self.db.add(user_answer)
@@ -211,22 +281,20 @@ class UserAnswerDao:
             是否更新成功
         """
         try:
-            user_answer = self.get_user_answer(paper_id, user_id)
-            if user_answer:
-                if 'answers' in answer_data:
-                    user_answer.answers = json.dumps(answer_data['answers'], ensure_ascii=False)
-                if 'score' in answer_data:
-                    user_answer.score = answer_data['score']
-                if 'correct_count' in answer_data:
-                    user_answer.correct_count = answer_data['correct_count']
-                if 'total_count' in answer_data:
-                    user_answer.total_count = answer_data['total_count']
-                if 'analysis_results' in answer_data:
-                    user_answer.analysis_results = json.dumps(answer_data['analysis_results'], ensure_ascii=False)
-                if 'overall_feedback' in answer_data:
-                    user_answer.overall_feedback = answer_data['overall_feedback']
-                
-                self.db.commit()
+            # 只取传入的字段构造部分UPDATE，单条语句直达，不再先SELECT
+            updatable_keys = ('answers', 'score', 'correct_count', 'total_count',
+                              'analysis_results', 'overall_feedback')
+            values = {key: answer_data[key] for key in updatable_keys if key in answer_data}
+            if not values:
+                return False
+
+            result = self.db.execute(
+                update(UserAnswer).where(
+                    and_(UserAnswer.paper_id == paper_id, UserAnswer.user_id == user_id)
+                ).values(**values)
+            )
+            self.db.commit()
+            if result.rowcount:
                 app_logger.info(f"成功更新答题记录: 用户{user_id}, 试题{paper_id}")
                 return True
             return False
@@ -235,17 +303,44 @@ class UserAnswerDao:
             app_logger.error(f"更新答题记录失败: {str(e)}")
             return False
     
-    def get_paper_all_answers(self, paper_id: str) -> List[UserAnswer]:
+    def get_user_answers_batch(self, paper_id: str, user_ids: List[str]) -> List[UserAnswer]:
         """
-        获取试题的所有答题记录
-        
+        批量获取多个用户的答题记录（单条IN查询，一次往返）
+
         Args:
             paper_id: 试题ID
-            
+            user_ids: 用户ID列表
+
         Returns:
-            答题记录列表
+            答题记录对象列表（缺失的用户不在其中）
         """
-        return self.db.query(UserAnswer).filter(UserAnswer.paper_id == paper_id).all()
+        if not user_ids:
+            return []
+        # 调用方要逐行读analysis_results：该字段是deferred的，不undefer
+        # 会退化成每行一条补查SELECT，正好抵消IN查询省下的往返
+        return self.db.query(UserAnswer).options(
+            undefer(UserAnswer.analysis_results)
+        ).filter(
+            and_(UserAnswer.paper_id == paper_id, UserAnswer.user_id.in_(user_ids))
+        ).all()
+
+    def get_paper_all_answers(self, paper_id: str):
+        """
+        获取试题的所有答题记录（流式迭代）
+
+        答题记录带有answers/analysis_results两个大JSON字段，热门试卷
+        一次性.all()会把全部记录驻留内存；这里按批流式取回，调用方
+        迭代消费即可，峰值内存只与批大小相关。
+
+        Args:
+            paper_id: 试题ID
+
+        Returns:
+            答题记录的可迭代对象
+        """
+        return self.db.query(UserAnswer).filter(
+            UserAnswer.paper_id == paper_id
+        ).execution_options(stream_results=True).yield_per(200)
     
     def delete_user_answer(self, paper_id: str, user_id: str) -> bool:
         """
@@ -259,10 +354,14 @@ class UserAnswerDao:
             是否删除成功
         """
         try:
-            user_answer = self.get_user_answer(paper_id, user_id)
-            if user_answer:
-                self.db.delete(user_answer)
-                self.db.commit()
+            # 单条DELETE直达，省去先SELECT装载对象
+            result = self.db.execute(
+                delete(UserAnswer).where(
+                    and_(UserAnswer.paper_id == paper_id, UserAnswer.user_id == user_id)
+                )
+            )
+            self.db.commit()
+            if result.rowcount:
                 app_logger.info(f"成功删除答题记录: 用户{user_id}, 试题{paper_id}")
                 return True
             return False
@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 """试题数据库模型"""
 
-from sqlalchemy import Column, String, Integer, Text, DateTime, DECIMAL
+from sqlalchemy import Column, String, Integer, Text, DateTime, DECIMAL, JSON, Index
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from config.db_config import Base
 
@@ -11,11 +12,12 @@ class Paper(Base):
     __tablename__ = 'papers'
     
     paper_id = Column(String(50), primary_key=True, comment='试题ID')
-    questions = Column(Text, nullable=False, comment='试题内容(JSON字符串)')
+    # 原生JSON列（MySQL 5.7+），由驱动负责编解码，省去Python层json.dumps/loads
+    questions = Column(JSON, nullable=False, comment='试题内容(JSON)')
     total_count = Column(Integer, nullable=False, comment='题目总数')
     created_at = Column(DateTime, server_default=func.now(), comment='创建时间')
     status = Column(String(20), default='active', comment='状态')
-    access_code = Column(String(50), unique=True, nullable=False, comment='访问码')
+    access_code = Column(String(50), unique=True, index=True, nullable=False, comment='访问码')
     user_id = Column(String(50), comment='创建者用户ID')
     
     def __repr__(self):
@@ -25,15 +27,21 @@ class Paper(Base):
 class UserAnswer(Base):
     """用户答题记录表模型"""
     __tablename__ = 'user_answers'
-    
+    # 答题记录按(paper_id, user_id)唯一定位，建复合唯一索引支撑查询/更新
+    __table_args__ = (
+        Index('ix_user_answers_paper_user', 'paper_id', 'user_id', unique=True),
+    )
+
     id = Column(Integer, primary_key=True, autoincrement=True, comment='主键ID')
     paper_id = Column(String(50), nullable=False, comment='试题ID')
     user_id = Column(String(50), nullable=False, comment='用户ID')
-    answers = Column(Text, comment='用户答案(JSON字符串)')
+    # 两个大JSON字段设为deferred：存在性检查、批量列表等查询不再拖回
+    # 整个JSON负载，真正访问属性时才按需加载
+    answers = deferred(Column(JSON, comment='用户答案(JSON)'))
     score = Column(DECIMAL(5, 2), comment='得分')
     correct_count = Column(Integer, comment='正确题目数')
     total_count = Column(Integer, comment='总题目数')
-    analysis_results = Column(Text, comment='分析结果(JSON字符串)')
+    analysis_results = deferred(Column(JSON, comment='分析结果(JSON)'))
     overall_feedback = Column(Text, comment='整体反馈')
     submitted_at = Column(DateTime, server_default=func.now(), comment='提交时间')
     
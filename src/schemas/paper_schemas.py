@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 #  author: ict
 from typing import List, Dict, Any, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class FileInfo(BaseModel):
@@ -37,7 +37,11 @@ class QuestionOptionForFrontend(BaseModel):
 
 class QuestionForGenerate(BaseModel):
     """题目模型（用于生成，包含完整信息）"""
-    question_id: str | int = Field(..., description="题目ID")
+    # question_id统一为str：单一类型只走一个校验分支；历史缓存里可能
+    # 存有int形式的ID，由coerce_numbers_to_str兼容
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    question_id: str = Field(..., description="题目ID")
     question_type: str = Field(..., description="题目类型")
     question_text: str = Field(..., description="题目文本")
     options: List[QuestionOptionForGenerate] = Field(..., description="选项列表")
@@ -45,7 +49,9 @@ class QuestionForGenerate(BaseModel):
 
 class QuestionForFrontend(BaseModel):
     """题目模型（用于前端，隐藏正确答案）"""
-    question_id: str | int = Field(..., description="题目ID")
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    question_id: str = Field(..., description="题目ID")
     question_type: str = Field(..., description="题目类型")
     question_text: str = Field(..., description="题目文本")
     options: List[QuestionOptionForFrontend] = Field(..., description="选项列表")
@@ -62,7 +68,7 @@ class GeneratePaperResponse(BaseModel):
 class UserAnswer(BaseModel):
     """用户答案模型"""
     question_id: str = Field(..., description="题目ID")
-    user_answer: str | list = Field(..., description="用户答案（单选题为字符串，多选题为列表）")
+    user_answer: str | List[str] = Field(..., description="用户答案（单选题为字符串，多选题为列表）")
 
 
 class AnalyzePaperSimpleRequest(BaseModel):
@@ -77,7 +83,7 @@ class AnalysisTask(BaseModel):
     question_id: str = Field(..., description="题目ID")
     question_type: str = Field(..., description="题目类型")
     question_text: str = Field(..., description="题目文本")
-    user_answer: str | list = Field(..., description="用户答案（单选题为字符串，多选题为列表）")
+    user_answer: str | List[str] = Field(..., description="用户答案（单选题为字符串，多选题为列表）")
     options: List[QuestionOptionForGenerate] = Field(..., description="选项列表")
 
 
@@ -94,10 +100,10 @@ class QuestionAnalysis(BaseModel):
     question_id: str = Field(..., description="题目ID")
     question_type: str = Field(..., description="题目类型")
     question_text: str = Field(..., description="题目文本")
-    user_answer: str | list = Field(..., description="用户答案（单选题为字符串，多选题为列表）")
+    user_answer: str | List[str] = Field(..., description="用户答案（单选题为字符串，多选题为列表）")
     is_correct: int = Field(..., description="答案正确性：0=全错，1=全对，2=部分正确")
     score: float = Field(..., description="得分")
-    correct_answer: str | list = Field(..., description="正确答案（单选题为字符串，多选题为列表）")
+    correct_answer: str | List[str] = Field(..., description="正确答案（单选题为字符串，多选题为列表）")
     explanation: str = Field(..., description="详细解释")
 
 
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""AI服务共享的OpenAI客户端与配置"""
+
+import os
+import threading
+
+import httpx
+from openai import OpenAI, AsyncOpenAI
+
+from config.app_config import CONFIG
+from config.log_config import app_logger
+
+# 从配置文件获取AI服务配置，提供默认值
+AI_SERVICE_CONFIG = CONFIG.get('ai_service', {})
+AI_BASE_URL = AI_SERVICE_CONFIG.get('base_url', 'http://localhost:18203/v1')
+AI_API_KEY = AI_SERVICE_CONFIG.get('key', '')
+AI_MODEL_NAME = AI_SERVICE_CONFIG.get('model_name', 'Qwen3-235B-A22B-Instruct-2507-FP8')
+
+# 生成与分析服务各自建客户端会各养一份连接池和TLS会话；集中到这里共享，
+# TLS握手得以摊薄，keep-alive连接跨服务复用，高并发fan-out时尾延迟更稳
+_TIMEOUT = httpx.Timeout(600.0, connect=5.0)
+_LIMITS = httpx.Limits(
+    max_connections=int(AI_SERVICE_CONFIG.get('max_connections', 100)),
+    max_keepalive_connections=50
+)
+_MAX_RETRIES = int(AI_SERVICE_CONFIG.get('max_retries', 2))
+# HTTP/2把高并发fan-out的大量请求复用到同一条TCP+TLS连接上，省掉握手
+# 并避免连接级队头阻塞；需要端点支持h2，默认关闭，确认后在配置里打开
+_HTTP2 = bool(AI_SERVICE_CONFIG.get('http2', False))
+
+# 同步客户端：生成服务的流式调用与Batch API使用
+client_check = OpenAI(
+    api_key=AI_API_KEY,
+    base_url=AI_BASE_URL,
+    timeout=_TIMEOUT,
+    max_retries=_MAX_RETRIES,
+    http_client=httpx.Client(limits=_LIMITS, http2=_HTTP2)
+)
+
+def make_async_client() -> AsyncOpenAI:
+    """
+    创建异步客户端（每次asyncio.run的事件循环内各建各的）
+
+    httpx.AsyncClient的keep-alive连接和池原语绑定在首次使用它的事件
+    循环上；分析服务在线程里用asyncio.run跑完即关循环，模块级共享的
+    异步客户端会在下一个循环里摸到已关闭循环的连接直接报
+    "Event loop is closed"。因此异步客户端按调用创建、用完关闭，
+    连接复用只发生在同一次run内的各分片之间。
+    """
+    return AsyncOpenAI(
+        api_key=AI_API_KEY,
+        base_url=AI_BASE_URL,
+        timeout=_TIMEOUT,
+        max_retries=_MAX_RETRIES,
+        http_client=httpx.AsyncClient(limits=_LIMITS, http2=_HTTP2)
+    )
+
+
+def _warmup_connection():
+    """后台预热到模型端点的TLS连接，把握手开销从首个业务请求上摘掉"""
+    try:
+        client_check.models.list()
+        app_logger.info("AI客户端连接预热完成")
+    except Exception as e:
+        app_logger.warning(f"AI客户端连接预热失败（不影响正常调用）: {str(e)}")
+
+
+# 导入期用守护线程预热，失败只记日志；脚本/离线任务可用环境变量跳过
+if not os.getenv('SKIP_AI_WARMUP'):
+    threading.Thread(target=_warmup_connection, daemon=True, name='ai-client-warmup').start()
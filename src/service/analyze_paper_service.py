@@ -1,28 +1,29 @@
 # -*- coding: utf-8 -*-
 #  author: ict
+import asyncio
+import bisect
+import functools
 import os
 import time
 from typing import List, Dict, Any, Optional
-from openai import OpenAI
+from openai import RateLimitError
 import json_repair
-from config.app_config import CONFIG, STATIC_FILE_PATH
+import orjson
+from config.app_config import STATIC_FILE_PATH
 from config.log_config import app_logger
+from service.ai_client import AI_SERVICE_CONFIG, AI_API_KEY, AI_MODEL_NAME, make_async_client
+from utils import llm_cache_util
+from utils.rate_limit_util import get_ai_rate_limiter
 
-# 从配置文件获取AI服务配置，提供默认值
-AI_SERVICE_CONFIG = CONFIG.get('ai_service', {})
-AI_BASE_URL = AI_SERVICE_CONFIG.get('base_url', 'http://localhost:18203/v1')
-AI_API_KEY = AI_SERVICE_CONFIG.get('key', '')
-AI_MODEL_NAME = AI_SERVICE_CONFIG.get('model_name', 'Qwen3-235B-A22B-Instruct-2507-FP8')
-
-client_check = OpenAI(
-    api_key=AI_API_KEY,
-    base_url=AI_BASE_URL
-)
+# 分析任务分片并发参数：每片题目数与同时在途请求数
+AI_ANALYZE_BATCH_SIZE = AI_SERVICE_CONFIG.get('analyze_batch_size', 10)
+AI_CONCURRENCY = AI_SERVICE_CONFIG.get('concurrency', 10)
 
 
+@functools.lru_cache(maxsize=64)
 def load_prompt_template(prompt_file: str = "analyze_paper.md") -> str:
     """
-    从prompts目录加载提示词模板
+    从prompts目录加载提示词模板（进程内缓存，模板文件不变）
     
     Args:
         prompt_file: 提示词文件名，默认为analyze_paper.md
@@ -39,6 +40,32 @@ def load_prompt_template(prompt_file: str = "analyze_paper.md") -> str:
         raise
 
 
+# 题目类型映射与判别集合：对每道题都要用，提升到模块级避免每次调用重建
+_TYPE_MAPPING = {
+    'single_choice': '单选题',
+    'multiple_choice': '多选题',
+    'true_false': '判断题',
+    'fill_blank': '填空题',
+    # 反向映射，支持中文类型
+    '单选题': '单选题',
+    '多选题': '多选题',
+    '判断题': '判断题',
+    '填空题': '填空题'
+}
+_SINGLE_TYPES = frozenset({'single_choice', '单选题'})
+_MULTI_TYPES = frozenset({'multiple_choice', '多选题'})
+
+# 整体评价阈值表：bisect按总分定位评语，替代逐级if/elif比较
+_FEEDBACK_THRESHOLDS = (60, 70, 80, 90)
+_FEEDBACK_TEXTS = (
+    "需要系统复习，建议重点关注错误题目!",
+    "部分知识点掌握，需要加强学习!",
+    "基本掌握相关知识，仍有提升空间!",
+    "专业基础良好，对知识点掌握较为全面!",
+    "专业功底扎实，细节把控近乎完美!",
+)
+
+
 def calculate_question_score(analysis_task: Dict[str, Any]) -> Dict[str, Any]:
     """
     计算单个题目的得分和正确性
@@ -56,27 +83,20 @@ def calculate_question_score(analysis_task: Dict[str, Any]) -> Dict[str, Any]:
     # 每题基础分数
     base_score = 10.0
     
-    # 题目类型映射（支持中英文）
-    type_mapping = {
-        'single_choice': '单选题',
-        'multiple_choice': '多选题',
-        'true_false': '判断题',
-        'fill_blank': '填空题',
-        # 反向映射，支持中文类型
-        '单选题': '单选题',
-        '多选题': '多选题',
-        '判断题': '判断题',
-        '填空题': '填空题'
-    }
-    
     # 获取中文题目类型
-    chinese_type = type_mapping.get(question_type, question_type)
-    
-    # 判断题目类型（支持中英文）
-    is_single_choice = question_type in ['single_choice', '单选题']
-    is_multiple_choice = question_type in ['multiple_choice', '多选题']
-    
-    if is_single_choice:
+    chinese_type = _TYPE_MAPPING.get(question_type, question_type)
+
+    # 一次遍历同时建立 id->选项 索引和正确答案ID列表，
+    # 替代后面各分支里的多次线性扫描
+    opt_by_id = {}
+    correct_ids = []
+    for opt in options:
+        opt_id = opt.get('id', '')
+        opt_by_id[opt_id] = opt
+        if opt.get('is_correct', False):
+            correct_ids.append(opt_id)
+
+    if question_type in _SINGLE_TYPES:
         # 单选题：用户答案应该是字符串
         if isinstance(user_answer, list):
             user_answer = user_answer[0] if user_answer else ''
@@ -84,21 +104,20 @@ def calculate_question_score(analysis_task: Dict[str, Any]) -> Dict[str, Any]:
             user_answer = str(user_answer).strip()
         
         # 获取正确答案
-        correct_options = [opt.get('id', '') for opt in options if opt.get('is_correct', False)]
-        correct_answer = correct_options[0] if correct_options else ''
+        correct_answer = correct_ids[0] if correct_ids else ''
             
-        # 找到用户选择的选项
-        for option in options:
-            if option.get('id', '') == user_answer:
-                option_is_correct = option.get('is_correct', False)
-                is_correct = 1 if option_is_correct else 0
-                return {
-                    'is_correct': is_correct,
-                    'score': base_score if option_is_correct else 0.0,
-                    'correct_answer': correct_answer,
-                    'explanation': option.get('explanation', ''),
-                    'chinese_type': chinese_type
-                }
+        # 找到用户选择的选项（字典查找替代线性搜索）
+        option = opt_by_id.get(user_answer)
+        if option is not None:
+            option_is_correct = option.get('is_correct', False)
+            is_correct = 1 if option_is_correct else 0
+            return {
+                'is_correct': is_correct,
+                'score': base_score if option_is_correct else 0.0,
+                'correct_answer': correct_answer,
+                'explanation': option.get('explanation', ''),
+                'chinese_type': chinese_type
+            }
         
         # 用户答案不在选项中
         return {
@@ -109,7 +128,7 @@ def calculate_question_score(analysis_task: Dict[str, Any]) -> Dict[str, Any]:
             'chinese_type': chinese_type
         }
         
-    elif is_multiple_choice:
+    elif question_type in _MULTI_TYPES:
         # 多选题：用户答案应该是列表
         if isinstance(user_answer, str):
             # 如果是字符串，转换为列表（兼容旧格式）
@@ -123,8 +142,8 @@ def calculate_question_score(analysis_task: Dict[str, Any]) -> Dict[str, Any]:
             user_options = set()
         
         # 获取所有正确答案
-        correct_options = {opt.get('id', '') for opt in options if opt.get('is_correct', False)}
-        correct_answer = sorted(list(correct_options))  # 返回列表格式
+        correct_options = set(correct_ids)
+        correct_answer = sorted(correct_ids)  # 返回列表格式
         
         # 检查是否有错误答案
         has_wrong_answer = len(user_options - correct_options) > 0
@@ -156,15 +175,15 @@ def calculate_question_score(analysis_task: Dict[str, Any]) -> Dict[str, Any]:
             'is_correct': is_correct,
             'score': score,
             'correct_answer': correct_answer,  # 列表格式
-            'explanation': f"正确答案包含选项：{', '.join(correct_answer)}",
+            # 下游一律用AI生成的个性化反馈覆盖解析，这里不再拼派生文案
+            'explanation': '',
             'chinese_type': chinese_type
         }
     
     else:
         # 未知题目类型
         # 获取正确答案（如果有的话）
-        correct_options = [opt.get('id', '') for opt in options if opt.get('is_correct', False)]
-        correct_answer = ''.join(correct_options) if correct_options else ''
+        correct_answer = ''.join(correct_ids) if correct_ids else ''
         
         return {
             'is_correct': 0,
@@ -186,64 +205,43 @@ def process_ai_analysis_results(ai_results: Dict[str, Any], analysis_tasks: List
     Returns:
         处理后的分析结果
     """
-    # 获取AI返回的results数组
-    ai_explanations = ai_results.get('results', [])
-    
     # 创建题目ID到AI反馈的映射
-    explanation_map = {}
-    for item in ai_explanations:
-        question_id = str(item.get('question_id', ''))
-        explanation_map[question_id] = item.get('explanation', '')
+    explanation_map = {
+        str(item.get('question_id', '')): item.get('explanation', '')
+        for item in ai_results.get('results', [])
+    }
     
-    # 处理每个分析任务
+    # 处理每个分析任务：单趟循环内完成评分、反馈映射与累计
     final_results = []
     total_score = 0.0
     correct_count = 0
     
     for task in analysis_tasks:
         question_id = str(task.get('question_id', ''))
-        # question_type = task.get('type', '')
-        question_text = task.get('question_text', '')
-        user_answer = task.get('user_answer', '')
         
         # 计算得分和正确性
         score_info = calculate_question_score(task)
         
-        # 获取AI生成的个性化反馈
-        ai_feedback = explanation_map.get(question_id, '未能生成个性化反馈')
-        
         # 构建最终结果
-        result = {
+        final_results.append({
             'question_id': question_id,
             'question_type': score_info['chinese_type'],  # 使用中文题目类型
-            'question_text': question_text,
-            'user_answer': user_answer,  # 保持原始格式（字符串或列表）
+            'question_text': task.get('question_text', ''),
+            'user_answer': task.get('user_answer', ''),  # 保持原始格式（字符串或列表）
             'is_correct': score_info['is_correct'],
             'score': score_info['score'],
             'correct_answer': score_info['correct_answer'],
-            'explanation': ai_feedback  # 使用AI生成的解释
-        }
-        
-        final_results.append(result)
+            # AI生成的个性化反馈
+            'explanation': explanation_map.get(question_id, '未能生成个性化反馈')
+        })
         total_score += score_info['score']
         if score_info['is_correct'] > 0:  # 有得分就算正确
             correct_count += 1
     
-    # 生成整体反馈
     total_count = len(analysis_tasks)
-    accuracy = (correct_count / total_count * 100) if total_count > 0 else 0
     
-    # 根据得分生成整体评价
-    if total_score >= 90:
-        overall_feedback = "专业功底扎实，细节把控近乎完美!"
-    elif total_score >= 80:
-        overall_feedback = "专业基础良好，对知识点掌握较为全面!"
-    elif total_score >= 70:
-        overall_feedback = "基本掌握相关知识，仍有提升空间!"
-    elif total_score >= 60:
-        overall_feedback = "部分知识点掌握，需要加强学习!"
-    else:
-        overall_feedback = "需要系统复习，建议重点关注错误题目!"
+    # 根据得分生成整体评价（阈值表查找）
+    overall_feedback = _FEEDBACK_TEXTS[bisect.bisect_right(_FEEDBACK_THRESHOLDS, total_score)]
     
     return {
         'analysis_results': final_results,
@@ -254,90 +252,186 @@ def process_ai_analysis_results(ai_results: Dict[str, Any], analysis_tasks: List
     }
 
 
+async def _chat_completion_with_backoff(client, estimated_tokens: int, **kwargs):
+    """带限流与429退避的异步chat completion调用
+
+    先向共享限流器申请配额，仍然撞上RateLimitError时指数退避重试
+    （基数1秒、封顶30秒、最多5次），避免并发分片互相触发重试风暴。
+    """
+    delay = 1.0
+    for attempt in range(5):
+        await get_ai_rate_limiter().acquire(estimated_tokens)
+        try:
+            return await client.chat.completions.create(**kwargs)
+        except RateLimitError as e:
+            if attempt == 4:
+                raise
+            app_logger.warning(f"触发模型限流(429)，{delay:.0f}秒后重试: {str(e)}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+
+async def _analyze_shard(
+        client,
+        shard: List[Dict[str, Any]],
+        system_prompt: str,
+        model_name: str,
+        temperature: float,
+        max_tokens: int,
+        semaphore: asyncio.Semaphore
+) -> Dict[str, Any]:
+    """
+    分析单个题目分片（失败时原地重试一次）
+
+    Args:
+        shard: 本分片的分析任务列表
+        system_prompt: 系统提示词
+        model_name: 模型名称
+        temperature: 采样温度
+        max_tokens: 最大输出token数
+        semaphore: 并发信号量
+        client: 本次事件循环内使用的异步客户端
+
+    Returns:
+        AI返回的分析结果字典
+    """
+    # 用orjson输出紧凑的标准JSON：dict.__str__的单引号/True样式既浪费
+    # token又容易诱导模型输出同样不合法的JSON
+    payload = orjson.dumps({"analysis_tasks": shard}).decode('utf-8')
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"请分析以下学员的答卷：\n\n{payload}"}
+    ]
+
+    # 粗略估算本次调用的token占用：输入按4字符≈1token，外加输出上限
+    estimated_tokens = (len(system_prompt) + len(messages[1]["content"])) // 4 + max_tokens
+
+    # 同一份答卷重复提交分析时命中磁盘缓存，整个分片不再调大模型
+    cache_key = llm_cache_util.make_cache_key(model_name, system_prompt, messages[1]["content"])
+    cached_text = llm_cache_util.get(cache_key)
+    if cached_text is not None:
+        app_logger.info(f"分片命中LLM输出磁盘缓存，题目数: {len(shard)}")
+        return json_repair.loads(cached_text)
+
+    async with semaphore:
+        try:
+            llm_start_time = time.time()
+            response = await _chat_completion_with_backoff(
+                client,
+                estimated_tokens,
+                model=model_name,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            app_logger.info(f"分片大模型调用完成，题目数: {len(shard)}, 耗时: {time.time() - llm_start_time:.2f}秒")
+            result_text = response.choices[0].message.content
+            parsed = json_repair.loads(result_text)
+            llm_cache_util.put(cache_key, result_text)
+            return parsed
+
+        except Exception as e:
+            # 第一次失败，进行重试
+            app_logger.warning(f"分片分析失败，准备重试: {str(e)}")
+            llm_start_time = time.time()
+            response = await _chat_completion_with_backoff(
+                client,
+                estimated_tokens,
+                model=model_name,
+                messages=messages,
+                temperature=temperature,
+            )
+            app_logger.info(f"分片重试调用完成，耗时: {time.time() - llm_start_time:.2f}秒")
+            result_text = response.choices[0].message.content
+            parsed = json_repair.loads(result_text)
+            llm_cache_util.put(cache_key, result_text)
+            return parsed
+
+
+async def _analyze_all_shards(
+        shards: List[List[Dict[str, Any]]],
+        system_prompt: str,
+        model_name: str,
+        temperature: float,
+        max_tokens: int
+) -> List[Any]:
+    """并发分析所有分片，单片失败不影响其他分片
+
+    异步客户端在本协程（即本次asyncio.run的事件循环）内创建并关闭：
+    跨循环复用的客户端会持有绑定在已关闭循环上的连接。连接复用仍然
+    覆盖同一次run内的全部分片。
+    """
+    semaphore = asyncio.Semaphore(AI_CONCURRENCY)
+    client = make_async_client()
+    try:
+        return await asyncio.gather(
+            *(
+                _analyze_shard(client, shard, system_prompt, model_name, temperature, max_tokens, semaphore)
+                for shard in shards
+            ),
+            return_exceptions=True
+        )
+    finally:
+        await client.close()
+
+
 def analyze_paper_answers(analysis_tasks: List[Dict[str, Any]], prompt_file: str = "analyze_paper.md"):
     """
     批量分析试卷答案，为每道题生成个性化反馈
-    
+
+    题目按analyze_batch_size分片后并发请求大模型：整卷耗时取决于最慢的
+    一个分片而不是所有题目之和，单个分片解析失败也只影响该片的反馈。
+
     Args:
         analysis_tasks: 包含题目信息、用户答案和选项的列表
         prompt_file: prompts目录下的提示词文件名，默认为analyze_paper.md
-        
+
     Returns:
         分析结果字典
     """
     start_time = time.time()
     app_logger.info("开始分析试卷答案...")
-    
+
     # 从配置文件读取相关配置，提供合理的默认值
     model_name = AI_MODEL_NAME
     temperature = AI_SERVICE_CONFIG.get('temperature', 0.3)  # 分析任务使用较低的温度
     max_tokens = AI_SERVICE_CONFIG.get('max_tokens', 4000)
-    
+
     # 从prompts目录加载提示词模板
     app_logger.info("加载提示词模板...")
     system_prompt = load_prompt_template(prompt_file)
-    
-    # 构建输入数据
-    input_data = {
-        "analysis_tasks": analysis_tasks
-    }
-    
-    # 根据提示词模板构建消息
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": f"请分析以下学员的答卷：\n\n{input_data}"}
+
+    # 按固定大小分片
+    shards = [
+        analysis_tasks[i:i + AI_ANALYZE_BATCH_SIZE]
+        for i in range(0, len(analysis_tasks), AI_ANALYZE_BATCH_SIZE)
     ]
 
     try:
-        # 第一次尝试
-        try:
-            app_logger.info("正在调用大模型分析试题，请稍候...")
-            llm_start_time = time.time()
-            
-            response = client_check.chat.completions.create(
-                model=model_name,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
-            
-            llm_end_time = time.time()
-            llm_duration = llm_end_time - llm_start_time
-            app_logger.info(f"大模型调用完成，耗时: {llm_duration:.2f}秒")
-            
-            result_text = response.choices[0].message.content
-            ai_results = json_repair.loads(result_text)
-            app_logger.info(f"LLM试卷分析原始输出: {result_text}")
-            
-        except Exception as e:
-            # 第一次失败，进行重试
-            app_logger.warning(f"JSON解析失败，准备重试: {str(e)}")
-            app_logger.info("重新调用大模型分析试题...")
-            
-            try:
-                # 重试一次
-                llm_start_time = time.time()
-                
-                response = client_check.chat.completions.create(
-                    model=model_name,
-                    messages=messages,
-                    temperature=temperature,
-                    # max_tokens=max_tokens
-                )
-                
-                llm_end_time = time.time()
-                llm_duration = llm_end_time - llm_start_time
-                app_logger.info(f"重试大模型调用完成，耗时: {llm_duration:.2f}秒")
-                
-                result_text = response.choices[0].message.content
-                ai_results = json_repair.loads(result_text)
-                app_logger.info(f"重试LLM试卷分析原始输出: {result_text}")
-                
-            except Exception as retry_e:
-                # 重试也失败，抛出异常
-                app_logger.error(f"重试后仍然失败，最终错误: {str(retry_e)}")
-                raise retry_e
-        
+        app_logger.info(f"正在并发调用大模型分析试题，共 {len(shards)} 个分片...")
+        # 本函数由线程池内的同步调用方使用，线程内无事件循环；异步客户端
+        # 在run出的循环内创建和关闭，不跨循环共享连接
+        shard_results = asyncio.run(
+            _analyze_all_shards(shards, system_prompt, model_name, temperature, max_tokens)
+        )
+
+        # 合并各分片的results；失败分片记日志后跳过，对应题目走默认反馈
+        merged_results = []
+        first_error = None
+        for shard, shard_result in zip(shards, shard_results):
+            if isinstance(shard_result, Exception):
+                first_error = first_error or shard_result
+                app_logger.error(f"分片分析最终失败（{len(shard)} 题）: {str(shard_result)}")
+                continue
+            if isinstance(shard_result, dict):
+                merged_results.extend(shard_result.get('results', []))
+
+        if not merged_results and first_error is not None:
+            # 所有分片都失败，维持原有的整体失败语义
+            raise first_error
+
+        ai_results = {'results': merged_results}
+
         # 处理AI分析结果，结合评分逻辑
         app_logger.info("处理AI分析结果...")
         final_results = process_ai_analysis_results(ai_results, analysis_tasks)
@@ -356,6 +450,14 @@ def analyze_paper_answers(analysis_tasks: List[Dict[str, Any]], prompt_file: str
 
 
 
+# 导入期预热提示词模板缓存，首个请求不再付模板读盘成本
+if not os.getenv('SKIP_AI_WARMUP'):
+    try:
+        load_prompt_template("analyze_paper.md")
+    except Exception:
+        pass  # 模板缺失时保持原有的首个请求时报错语义
+
+
 if __name__ == "__main__":
 
     def test_service():
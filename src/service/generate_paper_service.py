@@ -1,30 +1,121 @@
 # -*- coding: utf-8 -*-
 #  author: ict
+import functools
+import hashlib
+import json
+import mmap
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
-from openai import OpenAI
+from openai import RateLimitError
 import json_repair
-from config.app_config import CONFIG, STATIC_FILE_PATH
+from config.app_config import STATIC_FILE_PATH
 from config.log_config import app_logger
+from service.ai_client import AI_SERVICE_CONFIG, AI_API_KEY, AI_MODEL_NAME, client_check
 from utils.file_text_extractor_util import extract_text_from_file_content
+from utils import llm_cache_util
 from utils.paper_utils import convert_question_type_to_chinese
+from utils.rate_limit_util import get_ai_rate_limiter
 
-# 从配置文件获取AI服务配置，提供默认值
-AI_SERVICE_CONFIG = CONFIG.get('ai_service', {})
-AI_BASE_URL = AI_SERVICE_CONFIG.get('base_url', 'http://localhost:18203/v1')
-AI_API_KEY = AI_SERVICE_CONFIG.get('key', '')
-AI_MODEL_NAME = AI_SERVICE_CONFIG.get('model_name', 'Qwen3-235B-A22B-Instruct-2507-FP8')
+# 文档目录路径在导入期折叠为常量，不必每次调用重新join
+KNOWLEDGE_DIR = os.path.join(STATIC_FILE_PATH, 'knowledge')
+KNOWLEDGE_TEXT_DIR = os.path.join(STATIC_FILE_PATH, 'knowledge_text')
 
-client_check = OpenAI(
-    api_key=AI_API_KEY,
-    base_url=AI_BASE_URL
-)
 
+def _chat_completion_with_backoff(estimated_tokens: int, **kwargs):
+    """带限流与429退避的chat completion调用
 
+    先向共享限流器申请配额，仍然撞上RateLimitError时指数退避重试
+    （基数1秒、封顶30秒、最多5次）。
+    """
+    delay = 1.0
+    for attempt in range(5):
+        get_ai_rate_limiter().acquire_sync(estimated_tokens)
+        try:
+            return client_check.chat.completions.create(**kwargs)
+        except RateLimitError as e:
+            if attempt == 4:
+                raise
+            app_logger.warning(f"触发模型限流(429)，{delay:.0f}秒后重试: {str(e)}")
+            time.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+
+def _stream_completion_text(estimated_tokens: int, **kwargs) -> str:
+    """
+    以流式方式调用chat completion并拼接完整文本
+
+    相比一次性等待最后一个token，流式读取能在首token到达时就确认请求
+    在正常产出（并记录首token耗时），连接异常也能更早暴露，不用等整个
+    生成窗口超时。
+
+    Returns:
+        模型输出的完整文本
+    """
+    stream = _chat_completion_with_backoff(estimated_tokens, stream=True, **kwargs)
+    start_time = time.time()
+    first_token_at = None
+    pieces = []
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta and delta.content:
+            if first_token_at is None:
+                first_token_at = time.time()
+                app_logger.info(f"大模型首token耗时: {first_token_at - start_time:.2f}秒")
+            pieces.append(delta.content)
+    return ''.join(pieces)
+
+
+# 已解析LLM输出的缓存：按文本hash去重，重试期间拿到相同输出不重复解析
+_PARSE_CACHE: Dict[bytes, Any] = {}
+
+
+def _robust_parse(text: str) -> Optional[Dict[str, Any]]:
+    """
+    多级解析LLM输出，失败返回None
+
+    模型输出"轻微畸形JSON"是常态，直接重打一次LLM要多花几秒到几十秒；
+    先在本地依次尝试 标准json -> json_repair -> 截取首尾花括号子串，
+    全部失败才让调用方走LLM重试。
+    """
+    if not text:
+        return None
+
+    cache_key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+    cached = _PARSE_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    result = None
+    try:
+        result = json.loads(text)
+    except Exception:
+        try:
+            result = json_repair.loads(text)
+        except Exception:
+            # 去掉前后缀噪声（如markdown围栏、解释文字）后再修复一次
+            start, end = text.find('{'), text.rfind('}')
+            if 0 <= start < end:
+                try:
+                    result = json_repair.loads(text[start:end + 1])
+                except Exception:
+                    result = None
+
+    if isinstance(result, dict):
+        if len(_PARSE_CACHE) > 64:
+            _PARSE_CACHE.clear()
+        _PARSE_CACHE[cache_key] = result
+        return result
+    return None
+
+
+@functools.lru_cache(maxsize=64)
 def load_prompt_template(prompt_file: str) -> str:
     """
-    从prompts目录加载提示词模板
+    从prompts目录加载提示词模板（进程内缓存，模板文件不变）
     
     Args:
         prompt_file: 提示词文件名
@@ -41,9 +132,10 @@ def load_prompt_template(prompt_file: str) -> str:
         raise
 
 
+@functools.lru_cache(maxsize=64)
 def load_knowledge_document(doc_file: str) -> str:
     """
-    从knowledge_text目录加载知识文档
+    从knowledge_text目录加载知识文档（进程内缓存，文档按文件名不变）
     
     Args:
         doc_file: 文档文件名
@@ -51,7 +143,7 @@ def load_knowledge_document(doc_file: str) -> str:
     Returns:
         文档内容
     """
-    doc_path = os.path.join(STATIC_FILE_PATH, 'knowledge_text', doc_file)
+    doc_path = os.path.join(KNOWLEDGE_TEXT_DIR, doc_file)
     try:
         with open(doc_path, 'r', encoding='utf-8') as f:
             return f.read().strip()
@@ -60,6 +152,42 @@ def load_knowledge_document(doc_file: str) -> str:
         raise
 
 
+# 文本提取结果缓存：按(路径, mtime, size)为键，文件没变就不再重跑
+# PDF/DOCX解析（这是生成链路里最重的CPU环节之一）
+_EXTRACT_CACHE: Dict[tuple, str] = {}
+_EXTRACT_CACHE_MAX = 256
+
+
+def _extract_document_text(doc_path: str, doc_file: str) -> Optional[str]:
+    """提取单个文档的文本，带(mtime, size)键的进程内缓存"""
+    st = os.stat(doc_path)
+    cache_key = (doc_path, st.st_mtime_ns, st.st_size)
+    cached_text = _EXTRACT_CACHE.get(cache_key)
+    if cached_text is not None:
+        return cached_text
+
+    # mmap代替read()整读：不再把文件复制成bytes对象（下游的BytesIO/
+    # 临时文件写入都能直接消费buffer），大PDF的峰值内存省掉约一个文件
+    # 大小，冷读还能与其他worker共享页缓存
+    with open(doc_path, 'rb') as f:
+        if st.st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                extraction_result = extract_text_from_file_content(mm, doc_file)
+        else:
+            extraction_result = extract_text_from_file_content(b'', doc_file)
+    if 'error' in extraction_result:
+        app_logger.error(f"提取文档 {doc_file} 失败: {extraction_result['error']}")
+        return None
+
+    extracted_text = extraction_result.get('full_text', '')
+    if extracted_text:
+        app_logger.info(f"成功提取文档 {doc_file}，文本长度: {extraction_result['text_length']}")
+        if len(_EXTRACT_CACHE) >= _EXTRACT_CACHE_MAX:
+            _EXTRACT_CACHE.clear()
+        _EXTRACT_CACHE[cache_key] = extracted_text
+    return extracted_text
+
+
 def extract_text_from_documents(doc_files: List[str]) -> str:
     """
     从knowledge目录下的多个文档文件中提取文本内容
@@ -70,43 +198,48 @@ def extract_text_from_documents(doc_files: List[str]) -> str:
     Returns:
         合并后的文档内容
     """
-    combined_text = ""
-    knowledge_dir = os.path.join(STATIC_FILE_PATH, 'knowledge')
-    
+    knowledge_dir = KNOWLEDGE_DIR
+
+    existing_files = []
     for doc_file in doc_files:
         doc_path = os.path.join(knowledge_dir, doc_file)
-        
-        if not os.path.exists(doc_path):
+        if os.path.exists(doc_path):
+            existing_files.append((doc_file, doc_path))
+        else:
             app_logger.warning(f"文档文件不存在: {doc_path}")
-            continue
-            
+
+    def _extract_one(item):
+        doc_file, doc_path = item
         try:
-            # 读取文件内容
-            with open(doc_path, 'rb') as f:
-                file_content = f.read()
-            
-            # 使用文件文本提取工具提取文本
-            extraction_result = extract_text_from_file_content(file_content, doc_file)
-            
-            if 'error' in extraction_result:
-                app_logger.error(f"提取文档 {doc_file} 失败: {extraction_result['error']}")
-                continue
-                
-            extracted_text = extraction_result.get('full_text', '')
+            extracted_text = _extract_document_text(doc_path, doc_file)
             if extracted_text:
-                combined_text += f"\n\n=== 文档: {doc_file} ===\n{extracted_text}\n"
-                app_logger.info(f"成功提取文档 {doc_file}，文本长度: {extraction_result['text_length']}")
-            else:
+                return f"\n\n=== 文档: {doc_file} ===\n{extracted_text}\n"
+            if extracted_text is not None:
                 app_logger.warning(f"文档 {doc_file} 提取的文本为空")
-                
         except Exception as e:
             app_logger.error(f"处理文档 {doc_file} 时发生错误: {str(e)}")
-            continue
-    
-    if not combined_text.strip():
+        return None
+
+    # 多文档并行提取：PDF/DOCX解析大多在C扩展里释放GIL，线程池即可拿到
+    # 接近线性的加速；executor.map保持提交顺序，拼接结果仍然确定
+    if len(existing_files) > 1:
+        with ThreadPoolExecutor(max_workers=min(len(existing_files), os.cpu_count() or 4)) as executor:
+            parts = [part for part in executor.map(_extract_one, existing_files) if part]
+    else:
+        parts = [part for part in map(_extract_one, existing_files) if part]
+
+    # parts里只有非空片段，空判断直接看列表即可，
+    # 不必join后再对整串做一次strip拷贝
+    if not parts:
         raise ValueError("没有成功提取到任何文档内容")
-    
-    return combined_text
+
+    return "".join(parts)
+
+
+# 目录扫描结果的(过期时刻, 文件列表)缓存
+_AVAILABLE_DOCS_CACHE: Dict[str, tuple] = {}
+# 可用作知识文档的扩展名
+_ALLOWED_EXTS = frozenset({'.pdf', '.docx', '.doc', '.wps', '.wpt', '.txt'})
 
 
 def get_available_documents() -> List[str]:
@@ -116,23 +249,27 @@ def get_available_documents() -> List[str]:
     Returns:
         可用文档文件名列表
     """
-    knowledge_dir = os.path.join(STATIC_FILE_PATH, 'knowledge')
+    knowledge_dir = KNOWLEDGE_DIR
     available_docs = []
-    
+
+    # 短TTL缓存目录扫描结果，"默认文档"回退路径高频调用时不必每次listdir
+    cached = _AVAILABLE_DOCS_CACHE.get('knowledge')
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
     if not os.path.exists(knowledge_dir):
         app_logger.warning(f"knowledge目录不存在: {knowledge_dir}")
         return available_docs
     
     try:
-        for filename in os.listdir(knowledge_dir):
-            file_path = os.path.join(knowledge_dir, filename)
-            if os.path.isfile(file_path):
-                # 检查文件扩展名
-                _, ext = os.path.splitext(filename.lower())
-                if ext in ['.pdf', '.docx', '.doc', '.wps', '.wpt', '.txt']:
-                    available_docs.append(filename)
+        # scandir的DirEntry自带缓存的is_file()，比listdir+isfile少一半stat
+        with os.scandir(knowledge_dir) as it:
+            for entry in it:
+                if entry.is_file() and os.path.splitext(entry.name.lower())[1] in _ALLOWED_EXTS:
+                    available_docs.append(entry.name)
         
         app_logger.info(f"找到 {len(available_docs)} 个可用文档")
+        _AVAILABLE_DOCS_CACHE['knowledge'] = (time.monotonic() + 30, available_docs)
         return available_docs
         
     except Exception as e:
@@ -147,7 +284,7 @@ def get_available_text_documents() -> List[str]:
     Returns:
         可用文本文档文件名列表
     """
-    knowledge_text_dir = os.path.join(STATIC_FILE_PATH, 'knowledge_text')
+    knowledge_text_dir = KNOWLEDGE_TEXT_DIR
     available_docs = []
     
     if not os.path.exists(knowledge_text_dir):
@@ -155,10 +292,10 @@ def get_available_text_documents() -> List[str]:
         return available_docs
     
     try:
-        for filename in os.listdir(knowledge_text_dir):
-            file_path = os.path.join(knowledge_text_dir, filename)
-            if os.path.isfile(file_path) and filename.lower().endswith('.txt'):
-                available_docs.append(filename)
+        with os.scandir(knowledge_text_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.lower().endswith('.txt'):
+                    available_docs.append(entry.name)
         
         app_logger.info(f"找到 {len(available_docs)} 个可用文本文档")
         return available_docs
@@ -172,7 +309,8 @@ def generate_training_questions(
     text: str = None, 
     doc_file: str = None, 
     doc_files: List[str] = None,
-    prompt_file: str = "generate_paper.md"
+    prompt_file: str = "generate_paper.md",
+    bypass_cache: bool = False
 ) -> Dict[str, Any]:
     """
     根据知识文档生成培训测试题
@@ -182,6 +320,7 @@ def generate_training_questions(
         doc_file: knowledge_text目录下的文档文件名（可选，保持向后兼容）
         doc_files: knowledge目录下的文档文件名列表（可选）
         prompt_file: prompts目录下的提示词文件名，默认为generate_paper.md
+        bypass_cache: 为True时跳过磁盘缓存，强制重新调用大模型
         
     Returns:
         生成的测试题JSON结果
@@ -195,14 +334,16 @@ def generate_training_questions(
     max_tokens = AI_SERVICE_CONFIG.get('max_tokens', 4000)
     
     # 确定输入文本来源
+    extraction_future = None
     if text:
         input_text = text
         app_logger.info("使用直接提供的文本内容")
     elif doc_files:
-        # 新方式：从knowledge目录提取多个文档
+        # 新方式：从knowledge目录提取多个文档。解析PDF/DOCX是LLM调用前
+        # 最重的本地环节，放到后台线程与提示词模板加载重叠，发请求前再join
         app_logger.info(f"开始从 {len(doc_files)} 个文档中提取文本...")
-        input_text = extract_text_from_documents(doc_files)
-        app_logger.info(f"文档文本提取完成，总长度: {len(input_text)} 字符")
+        extraction_executor = ThreadPoolExecutor(max_workers=1)
+        extraction_future = extraction_executor.submit(extract_text_from_documents, doc_files)
     elif doc_file:
         # 旧方式：从knowledge_text目录读取单个txt文件（保持向后兼容）
         app_logger.info(f"从knowledge_text目录加载文档: {doc_file}")
@@ -224,9 +365,16 @@ def generate_training_questions(
             else:
                 raise ValueError("没有可用的知识文档")
     
-    # 从prompts目录加载提示词模板
+    # 从prompts目录加载提示词模板（与后台的文档提取并行）
     app_logger.info("加载提示词模板...")
     system_prompt = load_prompt_template(prompt_file)
+
+    if extraction_future is not None:
+        try:
+            input_text = extraction_future.result()
+        finally:
+            extraction_executor.shutdown(wait=False)
+        app_logger.info(f"文档文本提取完成，总长度: {len(input_text)} 字符")
     
     # 根据提示词模板构建消息
     messages = [
@@ -234,56 +382,85 @@ def generate_training_questions(
         {"role": "user", "content": f"请根据以下参考文档生成培训测试题：\n\n{input_text}"}
     ]
 
+    # 粗略估算本次调用的token占用：输入按4字符≈1token，外加输出上限
+    estimated_tokens = (len(system_prompt) + len(input_text)) // 4 + max_tokens
+
+    # 同(模型, 提示词, 输入)七天内命中磁盘缓存则复用上次输出，完全不付
+    # 推理成本——联调/压测反复用同一份文档生成时每次都能省掉整轮LLM调用
+    cache_key = llm_cache_util.make_cache_key(model_name, system_prompt, messages[1]['content'])
+    json_res = None
+    if not bypass_cache:
+        cached_text = llm_cache_util.get(cache_key)
+        if cached_text is not None:
+            json_res = _robust_parse(cached_text)
+            if json_res is not None:
+                app_logger.info("命中LLM输出磁盘缓存，跳过大模型调用")
+
     try:
-        # 第一次尝试
-        try:
-            app_logger.info("正在调用大模型生成试题，请稍候...")
-            llm_start_time = time.time()
-            
-            response = client_check.chat.completions.create(
-                model=model_name,
-                messages=messages,
-                temperature=temperature,
-                # max_tokens=max_tokens
-            )
-            
-            llm_end_time = time.time()
-            llm_duration = llm_end_time - llm_start_time
-            app_logger.info(f"大模型调用完成，耗时: {llm_duration:.2f}秒")
-            
-            cleaned_text = response.choices[0].message.content
-            json_res = json_repair.loads(cleaned_text)
-            app_logger.info(f"LLM培训题目生成输出: {json_res}")
-            
-        except Exception as e:
-            # 第一次失败，进行重试
-            app_logger.warning(f"JSON解析失败，准备重试: {str(e)}")
-            app_logger.info("重新调用大模型生成试题...")
-            
+        if json_res is None:
+            # 第一次尝试
             try:
-                # 重试一次
+                app_logger.info("正在调用大模型生成试题，请稍候...")
                 llm_start_time = time.time()
-                
-                response = client_check.chat.completions.create(
+            
+                cleaned_text = _stream_completion_text(
+                    estimated_tokens,
                     model=model_name,
                     messages=messages,
                     temperature=temperature,
                     # max_tokens=max_tokens
                 )
-                
+            
                 llm_end_time = time.time()
                 llm_duration = llm_end_time - llm_start_time
-                app_logger.info(f"重试大模型调用完成，耗时: {llm_duration:.2f}秒")
+                app_logger.info(f"大模型调用完成，耗时: {llm_duration:.2f}秒")
+            
+                json_res = _robust_parse(cleaned_text)
+                if json_res is None:
+                    raise ValueError("本地多级解析LLM输出失败")
+                llm_cache_util.put(cache_key, cleaned_text)
+                app_logger.info(f"LLM培训题目生成成功，解析到 {len(json_res.get('questions', []))} 道题")
+                # 完整输出只在DEBUG级记录；延迟格式化，级别不够时连
+                # 大字典的str()都不做
+                app_logger.debug("LLM培训题目生成输出: {}", json_res)
+            
+            except Exception as e:
+                # 第一次失败，进行重试
+                app_logger.warning(f"JSON解析失败，准备重试: {str(e)}")
+                app_logger.info("重新调用大模型生成试题...")
+            
+                try:
+                    # 重试一次
+                    llm_start_time = time.time()
+                
+                    cleaned_text = _stream_completion_text(
+                        estimated_tokens,
+                        model=model_name,
+                        messages=messages,
+                        temperature=temperature,
+                        # max_tokens=max_tokens
+                    )
+                
+                    llm_end_time = time.time()
+                    llm_duration = llm_end_time - llm_start_time
+                    app_logger.info(f"重试大模型调用完成，耗时: {llm_duration:.2f}秒")
                 
-                cleaned_text = response.choices[0].message.content
-                json_res = json_repair.loads(cleaned_text)
-                app_logger.info(f"重试LLM培训题目生成输出: {json_res}")
+                    json_res = _robust_parse(cleaned_text)
+                    if json_res is None:
+                        raise ValueError("重试后本地多级解析LLM输出仍失败")
+                    llm_cache_util.put(cache_key, cleaned_text)
+                    app_logger.info(f"重试LLM培训题目生成成功，解析到 {len(json_res.get('questions', []))} 道题")
+                    app_logger.debug("重试LLM培训题目生成输出: {}", json_res)
                 
-            except Exception as retry_e:
-                # 重试也失败，抛出异常
-                app_logger.error(f"重试后仍然失败，最终错误: {str(retry_e)}")
-                raise retry_e
+                except Exception as retry_e:
+                    # 重试也失败，抛出异常
+                    app_logger.error(f"重试后仍然失败，最终错误: {str(retry_e)}")
+                    raise retry_e
         
+        # 解析结果已落在json_res，尽早放掉MB级的输入文本与消息体引用，
+        # 后面的类型转换和序列化不必再陪着这份大字符串占内存
+        del messages, input_text
+
         # 转换题目类型为中文
         app_logger.info("转换题目类型为中文...")
         questions = json_res.get('questions', [])
@@ -305,6 +482,109 @@ def generate_training_questions(
         raise
 
 
+def generate_training_questions_batch(
+    doc_file_groups: List[List[str]],
+    prompt_file: str = "generate_paper.md",
+    poll_interval: int = 30,
+    completion_window: str = "24h"
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    通过Batch API批量生成多份试题（离线任务用，非实时路径）
+
+    一次性需要生成N份试卷时，逐份调用实时接口要排N次队；Batch API把
+    所有请求打包成一个JSONL文件提交，按批次定价（约为实时的一半），
+    代价是最长completion_window的完成时限。实时的单卷生成继续走
+    generate_training_questions，互不影响。
+
+    Args:
+        doc_file_groups: 每份试卷对应的文档文件名列表
+        prompt_file: prompts目录下的提示词文件名
+        poll_interval: 轮询批次状态的间隔秒数
+        completion_window: 批次完成时限
+
+    Returns:
+        与doc_file_groups等长的结果列表，失败的条目为None
+    """
+    import io
+    import json
+
+    start_time = time.time()
+    app_logger.info(f"开始批量生成 {len(doc_file_groups)} 份试卷...")
+
+    system_prompt = load_prompt_template(prompt_file)
+    model_name = AI_MODEL_NAME
+    temperature = AI_SERVICE_CONFIG.get('temperature', 0.5)
+
+    # 每组文档一行请求，custom_id记录组下标用于回填结果
+    jsonl_lines = []
+    for index, doc_files in enumerate(doc_file_groups):
+        input_text = extract_text_from_documents(doc_files)
+        jsonl_lines.append(json.dumps({
+            "custom_id": str(index),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": model_name,
+                "temperature": temperature,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": f"请根据以下参考文档生成培训测试题：\n\n{input_text}"}
+                ]
+            }
+        }, ensure_ascii=False))
+
+    batch_file = client_check.files.create(
+        file=io.BytesIO('\n'.join(jsonl_lines).encode('utf-8')),
+        purpose='batch'
+    )
+    batch = client_check.batches.create(
+        input_file_id=batch_file.id,
+        endpoint='/v1/chat/completions',
+        completion_window=completion_window
+    )
+    app_logger.info(f"批次已提交: {batch.id}，等待完成...")
+
+    while batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+        time.sleep(poll_interval)
+        batch = client_check.batches.retrieve(batch.id)
+
+    if batch.status != 'completed':
+        raise RuntimeError(f"批次 {batch.id} 未成功完成，状态: {batch.status}")
+
+    # 下载输出并按custom_id回填；单行解析失败只影响对应那份试卷
+    results: List[Optional[Dict[str, Any]]] = [None] * len(doc_file_groups)
+    output_content = client_check.files.content(batch.output_file_id)
+    for line in output_content.text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            index = int(record['custom_id'])
+            content = record['response']['body']['choices'][0]['message']['content']
+            json_res = json_repair.loads(content)
+            for question in json_res.get('questions', []):
+                question['question_type'] = convert_question_type_to_chinese(
+                    question.get('question_type', '')
+                )
+            results[index] = json_res
+        except Exception as e:
+            app_logger.error(f"解析批次输出行失败: {str(e)}")
+
+    succeeded = sum(1 for r in results if r is not None)
+    app_logger.info(
+        f"批量生成完成: {succeeded}/{len(doc_file_groups)} 份成功，总耗时: {time.time() - start_time:.2f}秒"
+    )
+    return results
+
+
+# 导入期预热提示词模板缓存，首个请求不再付模板读盘成本
+if not os.getenv('SKIP_AI_WARMUP'):
+    try:
+        load_prompt_template("generate_paper.md")
+    except Exception:
+        pass  # 模板缺失时保持原有的首个请求时报错语义
+
+
 if __name__ == "__main__":
     # 运行测试程序
 
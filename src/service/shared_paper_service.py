@@ -1,31 +1,93 @@
 # -*- coding: utf-8 -*-
 """共享试题服务层"""
 
-import json
+import time
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 
+import redis
+
 from config.log_config import app_logger
 from dao.paper_dao import PaperDao, UserAnswerDao
 from service.generate_paper_service import generate_training_questions
 from service.analyze_paper_service import analyze_paper_answers
-from utils.access_code_util import generate_paper_id, generate_unique_access_code, format_access_code_url
+from utils.access_code_util import generate_paper_id, generate_access_code, format_access_code_url
 from utils.redis_util import PaperTestStateProcessor
 from utils.paper_utils import hide_correct_answers, build_analysis_tasks_from_cache
 from utils.file_download_util import process_file_list
 from config.app_config import STATIC_FILE_PATH
 import os
 
+# 进程内L1缓存：热门试卷在同进程内直接命中内存，省掉Redis往返和整份
+# 题目JSON的反序列化（题目生成后不可变，短TTL即可；Redis仍是L2兜底）
+_PAPER_L1_CACHE: Dict[str, Any] = {}
+_ACCESS_CODE_L1_CACHE: Dict[str, Any] = {}
+_L1_TTL = 300  # 秒
+_L1_MAX = 512
+
+# 知识库目录在导入期折叠为常量
+KNOWLEDGE_DIR = os.path.join(STATIC_FILE_PATH, 'knowledge')
+
+
+def _l1_get(cache: Dict[str, Any], key: str):
+    entry = cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
+def _l1_put(cache: Dict[str, Any], key: str, value: Any) -> None:
+    if len(cache) >= _L1_MAX:
+        cache.clear()
+    cache[key] = (time.monotonic() + _L1_TTL, value)
+
 
 class SharedPaperService:
     """共享试题服务类"""
-    
+
+    # 请求作用域内每个请求都要实例化一次：固定槽位省掉实例__dict__，
+    # 三个协作对象延迟到首次访问才构造，只碰单条链路的接口不付全套
+    # 构造成本（cached_property依赖__dict__，故用槽位+手写懒加载）
+    __slots__ = ('db', 'redis_client', '_paper_dao', '_user_answer_dao', '_paper_processor')
+
     def __init__(self, db_session, redis_client):
         self.db = db_session
         self.redis_client = redis_client
-        self.paper_dao = PaperDao(db_session)
-        self.user_answer_dao = UserAnswerDao(db_session)
-        self.paper_processor = PaperTestStateProcessor(redis_client)
+        self._paper_dao = None
+        self._user_answer_dao = None
+        self._paper_processor = None
+
+    @property
+    def paper_dao(self) -> PaperDao:
+        if self._paper_dao is None:
+            self._paper_dao = PaperDao(self.db)
+        return self._paper_dao
+
+    @property
+    def user_answer_dao(self) -> UserAnswerDao:
+        if self._user_answer_dao is None:
+            self._user_answer_dao = UserAnswerDao(self.db)
+        return self._user_answer_dao
+
+    @property
+    def paper_processor(self) -> PaperTestStateProcessor:
+        if self._paper_processor is None:
+            self._paper_processor = PaperTestStateProcessor(self.redis_client)
+        return self._paper_processor
+
+    def _safe_redis(self, op, *args, fallback=None):
+        """
+        执行Redis操作，故障时降级而不是让请求失败
+
+        Redis挂掉时缓存读写都会抛连接/超时异常；读路径返回fallback后
+        自然落到下方的数据库分支（外加进程内L1），写路径丢一次缓存
+        回填无伤大雅。Redis分区期间服务照常可用。
+        """
+        try:
+            return op(*args)
+        except redis.RedisError as e:
+            app_logger.warning(f"Redis操作失败，降级继续: {str(e)}")
+            return fallback
     
     def generate_shared_paper(
         self,
@@ -46,14 +108,27 @@ class SharedPaperService:
             # 生成试题ID和访问码
             paper_id = generate_paper_id()
             
-            # 检查访问码是否已存在的函数
-            def check_access_code_exists(code: str) -> bool:
-                return self.paper_dao.get_paper_by_access_code(code) is not None
-            
-            access_code = generate_unique_access_code(check_access_code_exists)
+            # 用Redis SET NX原子预占访问码：O(1)且没有查重-写入之间的
+            # 竞态窗口，并发生成不再互踩；Redis降级时退回DB查重。
+            # 预占键7天过期而试题在库里长期存在，NX成功不代表库里没有
+            # 老试题占着该码，所以预占后仍补一次走唯一索引的DB探查，
+            # 数据库上的唯一约束仍是最终兜底
+            access_code = None
+            for _ in range(10):
+                candidate = generate_access_code()
+                reserved = self._safe_redis(
+                    self.paper_processor.reserve_access_code, candidate, paper_id
+                )
+                if reserved is False:
+                    continue
+                if self.paper_dao.get_paper_by_access_code(candidate) is None:
+                    access_code = candidate
+                    break
+            if access_code is None:
+                raise ValueError("无法在10次尝试内生成唯一访问码")
             
             # 处理文件列表，确保所有文件都可用
-            knowledge_dir = os.path.join(STATIC_FILE_PATH, 'knowledge')
+            knowledge_dir = KNOWLEDGE_DIR
             if file_list:
                 available_files = process_file_list(file_list, knowledge_dir)
             else:
@@ -95,8 +170,8 @@ class SharedPaperService:
                 'document_count': len(documents)
             }
             
-            self.paper_processor.save_shared_paper(paper_id, cache_data)
-            self.paper_processor.save_access_code_mapping(access_code, paper_id)
+            self._safe_redis(self.paper_processor.save_shared_paper, paper_id, cache_data)
+            self._safe_redis(self.paper_processor.save_access_code_mapping, access_code, paper_id)
             
             # 生成访问链接
             access_url = format_access_code_url(access_code)
@@ -115,6 +190,23 @@ class SharedPaperService:
             app_logger.error(f"生成共享试题失败: {str(e)}")
             raise
     
+    def _frontend_view_from_cache(self, paper_id: str, cached_data: Dict[str, Any]) -> Dict[str, Any]:
+        """由Redis缓存数据构建前端视图（隐藏答案）并回填L1"""
+        questions = cached_data.get('questions', [])
+        frontend_questions = hide_correct_answers(questions)
+
+        result = {
+            'paper_id': cached_data['paper_id'],
+            'access_code': cached_data['access_code'],
+            'questions': frontend_questions,
+            'total_count': len(frontend_questions),
+            'created_at': cached_data.get('created_at', ''),
+            'documents': cached_data.get('documents', []),
+            'document_count': cached_data.get('document_count', 0)
+        }
+        _l1_put(_PAPER_L1_CACHE, paper_id, result)
+        return result
+
     def get_paper_by_id(self, paper_id: str) -> Optional[Dict[str, Any]]:
         """
         根据试题ID获取试题
@@ -126,29 +218,22 @@ class SharedPaperService:
             试题信息（隐藏答案），如果不存在则返回None
         """
         try:
-            # 先从缓存获取
-            cached_data = self.paper_processor.get_shared_paper(paper_id)
+            # L1：进程内缓存的前端就绪数据，微秒级返回
+            l1_data = _l1_get(_PAPER_L1_CACHE, paper_id)
+            if l1_data is not None:
+                return l1_data
+
+            # L2：Redis缓存
+            cached_data = self._safe_redis(self.paper_processor.get_shared_paper, paper_id)
             if cached_data:
-                # 隐藏正确答案
-                questions = cached_data.get('questions', [])
-                frontend_questions = hide_correct_answers(questions)
-                
-                return {
-                    'paper_id': cached_data['paper_id'],
-                    'access_code': cached_data['access_code'],
-                    'questions': frontend_questions,
-                    'total_count': len(frontend_questions),
-                    'created_at': cached_data.get('created_at', ''),
-                    'documents': cached_data.get('documents', []),
-                    'document_count': cached_data.get('document_count', 0)
-                }
+                return self._frontend_view_from_cache(paper_id, cached_data)
             
             # 从数据库获取
             paper = self.paper_dao.get_paper_by_id(paper_id)
             if not paper or paper.status != 'active':
                 return None
             
-            questions = self.paper_dao.get_paper_questions(paper_id)
+            questions = self.paper_dao.get_paper_questions_cached(paper_id)
             if not questions:
                 return None
             
@@ -166,10 +251,10 @@ class SharedPaperService:
                 'documents': [],  # 从数据库获取的试题可能没有文档信息
                 'document_count': 0
             }
-            self.paper_processor.save_shared_paper(paper_id, cache_data)
-            self.paper_processor.save_access_code_mapping(paper.access_code, paper_id)
+            self._safe_redis(self.paper_processor.save_shared_paper, paper_id, cache_data)
+            self._safe_redis(self.paper_processor.save_access_code_mapping, paper.access_code, paper_id)
             
-            return {
+            result = {
                 'paper_id': paper.paper_id,
                 'access_code': paper.access_code,
                 'questions': frontend_questions,
@@ -178,6 +263,8 @@ class SharedPaperService:
                 'documents': cache_data['documents'],
                 'document_count': cache_data['document_count']
             }
+            _l1_put(_PAPER_L1_CACHE, paper_id, result)
+            return result
             
         except Exception as e:
             app_logger.error(f"获取试题失败: {str(e)}")
@@ -194,16 +281,31 @@ class SharedPaperService:
             试题信息（隐藏答案），如果不存在则返回None
         """
         try:
-            # 先从缓存获取试题ID
-            paper_id = self.paper_processor.get_paper_id_by_access_code(access_code)
-            if paper_id:
-                return self.get_paper_by_id(paper_id)
+            # L1：访问码->试题ID的进程内映射
+            l1_paper_id = _l1_get(_ACCESS_CODE_L1_CACHE, access_code)
+            if l1_paper_id is not None:
+                return self.get_paper_by_id(l1_paper_id)
+
+            # 单次往返同时取回映射与试题缓存，省掉get_paper_by_id里的
+            # 第二跳Redis GET
+            pair = self._safe_redis(self.paper_processor.get_paper_with_access_code, access_code)
+            if pair:
+                paper_id, cached_data = pair
+                if paper_id:
+                    _l1_put(_ACCESS_CODE_L1_CACHE, access_code, paper_id)
+                    l1_data = _l1_get(_PAPER_L1_CACHE, paper_id)
+                    if l1_data is not None:
+                        return l1_data
+                    if cached_data:
+                        return self._frontend_view_from_cache(paper_id, cached_data)
+                    return self.get_paper_by_id(paper_id)
             
             # 从数据库获取
             paper = self.paper_dao.get_paper_by_access_code(access_code)
             if not paper or paper.status != 'active':
                 return None
             
+            _l1_put(_ACCESS_CODE_L1_CACHE, access_code, paper.paper_id)
             return self.get_paper_by_id(paper.paper_id)
             
         except Exception as e:
@@ -229,10 +331,10 @@ class SharedPaperService:
         """
         try:
             # 获取完整题目信息
-            cached_data = self.paper_processor.get_shared_paper(paper_id)
+            cached_data = self._safe_redis(self.paper_processor.get_shared_paper, paper_id)
             if not cached_data:
                 # 从数据库获取
-                questions = self.paper_dao.get_paper_questions(paper_id)
+                questions = self.paper_dao.get_paper_questions_cached(paper_id)
                 if not questions:
                     raise ValueError(f"未找到试题 {paper_id}")
             else:
@@ -260,7 +362,9 @@ class SharedPaperService:
                 'analysis_results': result.get('analysis_results', []),
                 'overall_feedback': result.get('overall_feedback', '')
             }
-            app_logger.info(f"构建的答题记录数据: {answer_data}")
+            # 完整答题数据含整份analysis_results，只在DEBUG级延迟格式化，
+            # INFO级不再为每次提交str()一个大结构
+            app_logger.debug("构建的答题记录数据: {}", answer_data)
             
             # 保存到数据库
             existing_answer = self.user_answer_dao.get_user_answer(paper_id, user_id)
@@ -271,26 +375,70 @@ class SharedPaperService:
                 # 创建新记录
                 self.user_answer_dao.create_user_answer(answer_data)
             
-            # 保存到Redis缓存
-            cache_answer_data = answer_data.copy()
-            cache_answer_data['submitted_at'] = datetime.now().isoformat()
-            app_logger.info(f"保存到缓存的答题数据: {cache_answer_data}")
-            self.paper_processor.save_user_answer(paper_id, user_id, cache_answer_data)
+            # 保存到Redis缓存（内联构造，提交时间只取一次）
+            now_iso = datetime.now().isoformat()
+            cache_answer_data = {**answer_data, 'submitted_at': now_iso}
+            self._safe_redis(self.paper_processor.save_user_answer, paper_id, user_id, cache_answer_data)
             
             app_logger.info(f"用户 {user_id} 完成试题 {paper_id} 答题，得分: {result.get('total_score', 0)}")
             
-            return_data = {
+            return {
                 'paper_id': paper_id,
                 'user_id': user_id,
-                'submitted_at': datetime.now().isoformat()
+                'submitted_at': now_iso
             }
-            app_logger.info(f"返回的提交结果数据: {return_data}")
-            return return_data
             
         except Exception as e:
             app_logger.error(f"提交答案失败: {str(e)}")
             raise
     
+    def get_user_results_batch(self, paper_id: str, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取多个用户的答题结果
+
+        逐个调get_user_result是N次Redis GET加N次DB查询；这里缓存层
+        走一次MGET，缺的再用一条IN查询补齐，看板类查询只付两次往返。
+
+        Args:
+            paper_id: 试题ID
+            user_ids: 用户ID列表
+
+        Returns:
+            user_id -> 答题结果 的字典，未找到记录的用户不在其中
+        """
+        try:
+            results: Dict[str, Dict[str, Any]] = self._safe_redis(
+                self.paper_processor.get_user_answers_batch, paper_id, user_ids, fallback={}
+            ) or {}
+
+            missing = [user_id for user_id in user_ids if user_id not in results]
+            if missing:
+                for user_answer in self.user_answer_dao.get_user_answers_batch(paper_id, missing):
+                    results[user_answer.user_id] = {
+                        'paper_id': user_answer.paper_id,
+                        'user_id': user_answer.user_id,
+                        'analysis_results': user_answer.analysis_results or [],
+                        'total_score': float(user_answer.score) if user_answer.score else 0.0,
+                        'correct_count': user_answer.correct_count or 0,
+                        'total_count': user_answer.total_count or 0,
+                        'overall_feedback': user_answer.overall_feedback or '',
+                        'submitted_at': user_answer.submitted_at.isoformat() if user_answer.submitted_at else ''
+                    }
+
+            # 文档信息整批只取一次
+            paper_data = self._safe_redis(self.paper_processor.get_shared_paper, paper_id)
+            documents = paper_data.get('documents', []) if paper_data else []
+            document_count = paper_data.get('document_count', 0) if paper_data else 0
+            for result_data in results.values():
+                result_data.setdefault('documents', documents)
+                result_data.setdefault('document_count', document_count)
+
+            return results
+
+        except Exception as e:
+            app_logger.error(f"批量获取用户答题结果失败: {str(e)}")
+            return {}
+
     def get_user_result(self, paper_id: str, user_id: str) -> Optional[Dict[str, Any]]:
         """
         获取用户答题结果
@@ -306,11 +454,11 @@ class SharedPaperService:
             app_logger.info(f"开始获取用户答题结果: paper_id={paper_id}, user_id={user_id}")
             
             # 先从缓存获取
-            cached_data = self.paper_processor.get_user_answer(paper_id, user_id)
+            cached_data = self._safe_redis(self.paper_processor.get_user_answer, paper_id, user_id)
             if cached_data:
                 app_logger.info(f"从缓存获取用户答题结果: {cached_data}")
                 # 获取试题的文档信息
-                paper_data = self.paper_processor.get_shared_paper(paper_id)
+                paper_data = self._safe_redis(self.paper_processor.get_shared_paper, paper_id)
                 if paper_data:
                     cached_data['documents'] = paper_data.get('documents', [])
                     cached_data['document_count'] = paper_data.get('document_count', 0)
@@ -325,15 +473,8 @@ class SharedPaperService:
             
             app_logger.info(f"从数据库获取到答题记录: {user_answer}")
             
-            # 解析JSON数据
-            analysis_results = []
-            if user_answer.analysis_results:
-                try:
-                    analysis_results = json.loads(user_answer.analysis_results)
-                    app_logger.info(f"成功解析分析结果，共 {len(analysis_results)} 条")
-                except json.JSONDecodeError as e:
-                    app_logger.error(f"解析分析结果失败: {str(e)}")
-                    pass
+            # JSON列由驱动解码，读出即为Python列表
+            analysis_results = user_answer.analysis_results or []
             
             result_data = {
                 'paper_id': user_answer.paper_id,
@@ -347,7 +488,7 @@ class SharedPaperService:
             }
             
             # 获取试题的文档信息
-            paper_data = self.paper_processor.get_shared_paper(paper_id)
+            paper_data = self._safe_redis(self.paper_processor.get_shared_paper, paper_id)
             if paper_data:
                 result_data['documents'] = paper_data.get('documents', [])
                 result_data['document_count'] = paper_data.get('document_count', 0)
@@ -356,7 +497,7 @@ class SharedPaperService:
                 result_data['document_count'] = 0
             
             # 重新缓存到Redis
-            self.paper_processor.save_user_answer(paper_id, user_id, result_data)
+            self._safe_redis(self.paper_processor.save_user_answer, paper_id, user_id, result_data)
             
             return result_data
             
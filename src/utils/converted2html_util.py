@@ -3,53 +3,81 @@
 
 import os
 import re
-import tempfile
-import uuid
 from io import BytesIO
 
 from bs4 import BeautifulSoup
+from lxml import html as lxml_html
 from pdfminer.high_level import extract_text_to_fp
-from spire.doc import Document, FileFormat
+from spire.doc import Document, FileFormat, Stream
 
 from config.app_config import STATIC_FILE_PATH
 from config.log_config import app_logger
 
+# 预编译热路径正则：字体处理逐span执行、日志截断逐条执行，
+# 不必每次都走re模块的缓存查找
+_WS_RE = re.compile(r'\s+')
 
+# 字体映射与交替正则：一次扫描同时完成命中判断与替换目标定位
+_FONT_MAP = {
+    'simhei': '黑体',
+    'simsun-bold': '宋体',
+    'fangsong_gb2312': '仿宋'
+}
+_FONT_MAP_RE = re.compile(
+    r'(font-family:\s*)[^;]*?(simhei|simsun-bold|fangsong_gb2312)[^;]*',
+    re.IGNORECASE
+)
 
-class ConversionExtraUtil:
-    @staticmethod
-    def replace_div_with_p(html_content):
-        # 解析 HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
 
-        # 找到所有 div 标签
-        divs = soup.find_all('div')
+def _font_replacement(match):
+    return f'{match.group(1)}"{_FONT_MAP[match.group(2).lower()]}"'
 
-        for div in divs:
-            # 创建一个新的 p 标签，并复制 div 的内容和属性
-            p_tag = soup.new_tag('p')
 
-            # 复制 div 的所有属性到 p 标签
-            for attr, value in div.attrs.items():
-                p_tag[attr] = value
+# 页码文本匹配：一个正则覆盖 "Page "、"Page:"、"Page：" 三种形式
+_PAGE_RE = re.compile(r'Page[ :：]')
+# 页内锚点链接的href匹配（如 <a href="#1">）
+_ANCHOR_HREF_RE = re.compile(r'^#')
 
-            # 复制 div 的所有子元素到 p 标签
-            p_tag.extend(div.contents)
+# 转换结果缓存：按(路径, mtime, size)指纹，源文件没变就不再重跑
+# Spire/pdfminer加soup清洗的整条流水线（单次命中省掉数秒CPU）
+_CONVERT_CACHE: dict = {}
+_CONVERT_CACHE_MAX = 64
 
-            # 用 p 标签替换 div 标签
-            div.replace_with(p_tag)
 
-        # 返回修改后的 HTML
-        return str(soup)
+def _file_fingerprint(path: str) -> tuple:
+    st = os.stat(path)
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+def _convert_cache_put(key: tuple, value: str) -> None:
+    if len(_CONVERT_CACHE) >= _CONVERT_CACHE_MAX:
+        _CONVERT_CACHE.clear()
+    _CONVERT_CACHE[key] = value
+
+
+
+class ConversionExtraUtil:
     @staticmethod
-    def remove_div_tags(html_content):
+    def replace_div_with_p(html_content):
         # 解析 HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = BeautifulSoup(html_content, 'lxml')
+
+        # 直接改标签名即可：属性和子节点原地保留，不必新建p标签
+        # 再逐项搬运属性与内容
+        for div in soup.find_all('div'):
+            div.name = 'p'
 
-        # 找到 body 标签
+        # 返回修改后的 HTML
+        return str(soup)
+    # 以下soup级操作供单次解析流水线复用：每步直接修改同一棵树，
+    # 不再各自解析+序列化一轮
+
+    @staticmethod
+    def _unwrap_body_divs(soup):
+        """把body直接子级的div标签解包为其内容"""
         body = soup.body
         if not body:
-            return html_content  # 如果没有 body 标签，直接返回原内容
+            return
 
         # 遍历 body 下的所有直接子标签
         for child in list(body.children):
@@ -58,44 +86,97 @@ class ConversionExtraUtil:
                 # 用 div 的内容替换 div 标签本身
                 child.unwrap()
 
-        # 返回处理后的 HTML
+    @staticmethod
+    def _remove_page_numbers(soup):
+        """移除页码文本所在的标签"""
+        body = soup.body
+        if not body:
+            return
+
+        # 单趟遍历查找所有包含页码文本的标签：原先两个lambda过滤器中
+        # "包含"本就涵盖"开头"，整棵树被遍历了两遍；预编译正则的search
+        # 可直接作为string过滤器使用
+        for tag in body.find_all(string=_PAGE_RE.search):
+            # 移除包含页码的整个父标签（通常是div或span）
+            parent = tag.parent
+            if parent:
+                parent.decompose()
+
+        # 额外处理：查找包含页码链接的标签（如 <a href="#1">1</a>）。
+        # href过滤用预编译正则（C层匹配）；先排除非数字链接再上溯父级，
+        # 手写的父指针循环替代find_parent的通用匹配开销
+        for a_tag in body.find_all('a', href=_ANCHOR_HREF_RE):
+            if not a_tag.string or not a_tag.string.isdigit():
+                continue
+            parent = a_tag.parent
+            while parent is not None and parent.name != 'div':
+                parent = parent.parent
+            if parent is not None and any(p in parent.get_text() for p in ('Page', 'page')):
+                parent.decompose()
+
+    @staticmethod
+    def _strip_class_attributes(soup):
+        """去除body（不存在时为整个文档）内所有标签的class属性"""
+        body = soup.find('body')
+        target = body if body else soup
+
+        # 找到目标范围内的所有标签并移除 class 属性
+        for tag in target.find_all(True):  # True 表示匹配所有标签
+            if 'class' in tag.attrs:
+                del tag.attrs['class']
+
+    @staticmethod
+    def _fix_fonts_and_lines(soup):
+        """转换特定字体族，并把黑色线条改为红色"""
+        for span in soup.find_all('span', style=True):
+            style = span['style']
+
+            # 处理字体转换（忽略大小写）：单个交替正则一趟扫描即完成
+            # 命中判断与替换，替代先search再按映射表逐项substring比对
+            new_style = _FONT_MAP_RE.sub(_font_replacement, style)
+
+            # 处理线条颜色（将黑色改为红色），基于已替换字体的样式串，
+            # 两类修正不再互相覆盖
+            if 'border:' in new_style and 'black' in new_style:
+                new_style = new_style.replace('black', 'red')
+
+            if new_style != style:
+                span['style'] = new_style
+
+    @staticmethod
+    def clean_pipeline(html_content: str) -> str:
+        """
+        PDF转HTML的清洗流水线
+
+        解析一次，依次在同一棵soup上做div解包、页码清除、class剥离和
+        字体/线条修正，最后序列化一次。多MB的HTML上解析和序列化是
+        大头，逐步函数各parse+serialize一轮时这部分开销要乘以步数。
+        """
+        soup = BeautifulSoup(html_content, 'lxml')
+        ConversionExtraUtil._unwrap_body_divs(soup)
+        ConversionExtraUtil._remove_page_numbers(soup)
+        ConversionExtraUtil._strip_class_attributes(soup)
+        ConversionExtraUtil._fix_fonts_and_lines(soup)
         return str(soup)
 
     @staticmethod
-    def remove_page_numbers(html_content):
+    def remove_div_tags(html_content):
         # 解析 HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
-
-        # 找到 body 标签
-        body = soup.body
-        if not body:
+        soup = BeautifulSoup(html_content, 'lxml')
+        if not soup.body:
             return html_content  # 如果没有 body 标签，直接返回原内容
+        ConversionExtraUtil._unwrap_body_divs(soup)
+        return str(soup)
 
-        # 改进1：使用 string 参数替代已废弃的 text 参数
-        # 改进2：扩展匹配模式，包括 "Page:"、"Page " 等多种形式
-        # 改进3：同时查找包含页码的 div 标签
-        page_patterns = [
-            lambda s: s and any(s.strip().startswith(p) for p in ['Page ', 'Page:', 'Page：']),
-            lambda s: s and any(p in s.strip() for p in ['Page ', 'Page:', 'Page：'])
-        ]
-
-        # 查找所有包含页码文本的标签
-        for pattern in page_patterns:
-            for tag in body.find_all(string=pattern):
-                # 移除包含页码的整个父标签（通常是div或span）
-                parent = tag.parent
-                if parent:
-                    parent.decompose()
-
-        # 额外处理：查找包含页码链接的标签（如 <a href="#1">1</a>）
-        for a_tag in body.find_all('a', href=lambda x: x and x.startswith('#')):
-            if a_tag.string and a_tag.string.isdigit():
-                parent_div = a_tag.find_parent('div')
-                if parent_div and any(p in parent_div.get_text() for p in ['Page', 'page']):
-                    parent_div.decompose()
-
-        # 返回处理后的 HTML
+    @staticmethod
+    def remove_page_numbers(html_content):
+        # 解析 HTML
+        soup = BeautifulSoup(html_content, 'lxml')
+        if not soup.body:
+            return html_content  # 如果没有 body 标签，直接返回原内容
+        ConversionExtraUtil._remove_page_numbers(soup)
         return str(soup)
+
     @staticmethod
     def remove_all_class_attributes(html_content):
         """
@@ -107,21 +188,14 @@ class ConversionExtraUtil:
         返回:
             str: 处理后的 HTML 内容
         """
-        # 使用 BeautifulSoup 解析 HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
-
-        # 找到 body 标签，如果不存在则处理整个文档
-        body = soup.find('body')
-        target = body if body else soup
-
-        # 找到目标范围内的所有标签并移除 class 属性
-        for tag in target.find_all(True):  # True 表示匹配所有标签
-            if 'class' in tag.attrs:
-                del tag.attrs['class']
-
-        # 返回处理后的 HTML 字符串
-        return str(soup)
-
+        # 独立调用时（Word转换路径只有这一个清洗步骤）直接用lxml：
+        # XPath定位和属性删除全在C层完成，不经过soup的Python包装对象
+        tree = lxml_html.fromstring(html_content)
+        bodies = tree.xpath('//body')
+        scope = bodies[0] if bodies else tree
+        for element in scope.xpath('.//*[@class]'):
+            del element.attrib['class']
+        return lxml_html.tostring(tree, encoding='unicode')
 
     @staticmethod
     def handling_fonts_and_lines(html_content: str) -> str:
@@ -130,39 +204,8 @@ class ConversionExtraUtil:
         1. 转换特定字体族
         2. 将黑色线条改为红色
         """
-        # 使用BeautifulSoup解析HTML
-        soup = BeautifulSoup(html_content, 'html.parser')
-
-        # 1. 处理字体转换
-        font_mapping = {
-            'simhei': '黑体',
-            'simsun-bold': '宋体',
-            'fangsong_gb2312': '仿宋'
-        }
-
-        for span in soup.find_all('span', style=True):
-            style = span['style']
-
-            # 处理字体转换（忽略大小写）
-            font_family_match = re.search(r'font-family:\s*([^;]+)', style, re.IGNORECASE)
-            if font_family_match:
-                original_font = font_family_match.group(1).lower()
-                for key, value in font_mapping.items():
-                    if key in original_font:
-                        # 替换字体
-                        new_style = re.sub(
-                            r'(font-family:\s*)([^;]+)',
-                            f'\\1"{value}"',
-                            style,
-                            flags=re.IGNORECASE
-                        )
-                        span['style'] = new_style
-                        break
-
-            # 2. 处理线条颜色（将黑色改为红色）
-            if 'border:' in style and 'black' in style:
-                span['style'] = style.replace('black', 'red')
-
+        soup = BeautifulSoup(html_content, 'lxml')
+        ConversionExtraUtil._fix_fonts_and_lines(soup)
         return str(soup)
 
 
@@ -179,34 +222,38 @@ class DocumentConverter:
         if not os.path.exists(word_file):
             raise FileNotFoundError(f"文件不存在: {word_file}")
 
-        # 使用临时目录处理文件转换
-        with tempfile.TemporaryDirectory() as temp_dir:
+        cache_key = _file_fingerprint(word_file)
+        cached = _CONVERT_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
+        try:
+            # 加载 Word 文档
+            doc = Document()
+            doc.LoadFromFile(word_file)
+
+            # 直接保存到内存流：HTML内容不出进程，省掉临时文件的
+            # 写盘、回读和目录清理
+            stream = Stream()
             try:
-                # 在临时目录中生成 HTML 文件名
-                temp_html_file = os.path.join(temp_dir, f"{uuid.uuid4()}.html")
-                
-                # 加载 Word 文档
-                doc = Document()
-                doc.LoadFromFile(word_file)
-                
-                # 将 Word 文档保存为 HTML 文件到临时目录
-                doc.SaveToFile(temp_html_file, FileFormat.Html)
+                doc.SaveToStream(stream, FileFormat.Html)
+                data = bytes(stream.ToArray()).decode('utf-8')
+            finally:
+                stream.Close()
                 doc.Close()
-                
-                # 读取 HTML 文件内容并去掉水印信息
-                with open(temp_html_file, 'r', encoding='utf-8') as f:
-                    data = f.read()
-                    data = data.replace('Evaluation Warning: The document was created with Spire.Doc for Python.', '')
-                
-                # 处理 HTML 内容并返回
-                res = ConversionExtraUtil.remove_all_class_attributes(data)
-                app_logger.info(f"Word转HTML完成，临时文件已自动清理: {temp_html_file}")
-                return res
-                
-            except Exception as e:
-                app_logger.error(f"Word转HTML失败: {str(e)}")
-                raise
-            # 临时目录和其中的所有文件会在 with 语句结束时自动删除
+
+            # 去掉水印信息
+            data = data.replace('Evaluation Warning: The document was created with Spire.Doc for Python.', '')
+
+            # 处理 HTML 内容并返回
+            res = ConversionExtraUtil.remove_all_class_attributes(data)
+            _convert_cache_put(cache_key, res)
+            app_logger.info("Word转HTML完成（内存流转换，无临时文件）")
+            return res
+
+        except Exception as e:
+            app_logger.error(f"Word转HTML失败: {str(e)}")
+            raise
 
     def truncate_log_content(self, content: str, max_length: int = 500) -> str:
         """
@@ -223,7 +270,7 @@ class DocumentConverter:
             return str(content)
 
         # 去除多余的空白字符
-        content = re.sub(r'\s+', ' ', content.strip())
+        content = _WS_RE.sub(' ', content.strip())
 
         if len(content) <= max_length:
             return content
@@ -236,6 +283,11 @@ class DocumentConverter:
         if not os.path.exists(pdf_file):
             raise FileNotFoundError(f"文件不存在: {pdf_file}")
 
+        cache_key = _file_fingerprint(pdf_file)
+        cached = _CONVERT_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
         output_buffer = BytesIO()
 
         # Convert the PDF to HTML and write the HTML to the buffer
@@ -244,11 +296,9 @@ class DocumentConverter:
 
         # Retrieve the HTML content from the buffer
         html_content = output_buffer.getvalue().decode('utf-8')
-        html_content = ConversionExtraUtil.remove_div_tags(html_content)
-        res = ConversionExtraUtil.remove_page_numbers(html_content)
-        res = ConversionExtraUtil.remove_all_class_attributes(res)
-        app_logger.info("开始转换字体和线条")
-        res = ConversionExtraUtil.handling_fonts_and_lines(res)
+        # 单次解析流水线：全部清洗共用一轮parse+serialize
+        res = ConversionExtraUtil.clean_pipeline(html_content)
+        _convert_cache_put(cache_key, res)
 
         app_logger.info(f"PDF转成HTML：{self.truncate_log_content(res)}")
         return res
@@ -11,14 +11,11 @@ def create_all_tables():
     创建所有数据库表
     """
     try:
-        # 创建所有表
-        Base.metadata.create_all(bind=engine)
-        app_logger.info(" 数据库表创建成功")
-        
-        # 打印创建的表信息
-        tables = Base.metadata.tables.keys()
-        for table_name in tables:
-            app_logger.info(f"   - 表 {table_name} 已创建")
+        # 同一连接同一事务内完成全部存在性检查与建表DDL，
+        # 不再按语句各自从连接池checkout（checkfirst保证幂等）
+        with engine.begin() as conn:
+            Base.metadata.create_all(bind=conn, checkfirst=True)
+        app_logger.info(f" 数据库表创建成功: {list(Base.metadata.tables)}")
             
     except Exception as e:
         app_logger.error(f" 数据库表创建失败: {str(e)}")
@@ -1,37 +1,58 @@
 # -*- coding: utf-8 -*-
 #  author: ict
-import io
+import asyncio
 import os
-import sys
-from typing import Optional, Dict, Any
-from urllib.parse import urlparse
-
-# 添加项目根目录到Python路径
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Dict
+from urllib.parse import unquote
 
 import minio
+import urllib3
 from minio.error import S3Error
 from config import log_config
 from config.app_config import CONFIG
+from functools import lru_cache
+import re
+
+# MinIO文件URL的固定形状: http(s)://host/bucket/<object_name>[?query]
+# 一次C层正则匹配直接取出object_name，替代urlparse+strip+split+join
+_URL_OBJ_RE = re.compile(r"^https?://[^/]+/[^/]+/(.+?)(?:\?|$)")
+
+
+# 已确认存在的目录集合：同一批下载落到同一个knowledge_dir时，
+# makedirs沿路径逐级stat的系统调用只付一次
+_ensured_dirs: set = set()
+_ensured_dirs_lock = threading.Lock()
+
+
+def _ensure_dir(path: str) -> None:
+    """确保目录存在（进程内记忆已建过的目录，避免重复stat）"""
+    if not path or path in _ensured_dirs:
+        return
+    os.makedirs(path, exist_ok=True)
+    with _ensured_dirs_lock:
+        _ensured_dirs.add(path)
 
 
 class MinioConfig:
     """Minio配置类"""
 
     def __init__(self, config_dict: dict):
-        self.endpoint = config_dict.get("endpoint")
-        self.access_key = config_dict.get("access_key")
-        self.secret_key = config_dict.get("secret_key")
+        self.endpoint = config_dict.get("endpoint", "172.18.1.7:9700")
+        self.access_key = config_dict.get("access_key", "")
+        self.secret_key = config_dict.get("secret_key", "")
         self.schema = config_dict.get("schema", False)  # 是否使用HTTPS
         self.cert_check = config_dict.get("cert_check", True)
-        self.bucket_name = config_dict.get("bucket_name")
-        self.tmp_bucket_name = config_dict.get("tmp_bucket_name")
+        self.bucket_name = config_dict.get("bucket_name", "cedc-smart-apps")
+        self.tmp_bucket_name = config_dict.get("tmp_bucket_name", "cedc-smart-apps-tmp-dir")
 
 
 class MinioFileDownloader:
     """MinIO文件下载器 - 简化版本"""
 
-    def __init__(self, config: MinioConfig):
+    def __init__(self, config: MinioConfig, http_client=None):
         self.config = config
         self.minio_client = minio.Minio(
             endpoint=config.endpoint,
@@ -39,6 +60,7 @@ class MinioFileDownloader:
             secret_key=config.secret_key,
             secure=config.schema,
             cert_check=config.cert_check,
+            http_client=http_client,
         )
 
     def download_file_to_bytes(self, object_name: str, bucket_name: str = None) -> bytes:
@@ -64,13 +86,21 @@ class MinioFileDownloader:
                 object_name=object_name
             )
 
-            # 读取文件内容
-            file_data = response.read()
-            response.close()
-            response.release_conn()
+            # 按1MiB分块读入bytearray：避免一次read()在内部反复扩容拷贝；
+            # finally里归还连接，异常时连接也不会滞留在池外
+            file_data = bytearray()
+            try:
+                while True:
+                    chunk = response.read(1 << 20)
+                    if not chunk:
+                        break
+                    file_data.extend(chunk)
+            finally:
+                response.close()
+                response.release_conn()
 
             log_config.app_logger.info(f"MinIO文件下载成功: {len(file_data)} 字节")
-            return file_data
+            return bytes(file_data)
 
         except S3Error as e:
             log_config.app_logger.error(f"MinIO下载错误: {e}")
@@ -79,6 +109,40 @@ class MinioFileDownloader:
             log_config.app_logger.error(f"下载文件时发生错误: {e}")
             raise
 
+    def download_object_to_path(self, object_name: str, local_path: str,
+                                bucket_name: str = None, chunk: int = 1 << 20) -> None:
+        """
+        将MinIO对象流式写入本地文件
+
+        边读边写，整个过程内存占用只有一个chunk大小，不再把完整对象
+        物化成bytes后再落盘（大文件时那样峰值内存翻倍）。
+
+        Args:
+            object_name: 对象名称
+            local_path: 本地保存路径
+            bucket_name: 桶名称
+            chunk: 分块大小，默认1MiB
+        """
+        if bucket_name is None:
+            bucket_name = self.config.bucket_name
+
+        log_config.app_logger.info(f"开始流式下载MinIO文件: bucket={bucket_name}, object={object_name}")
+
+        _ensure_dir(os.path.dirname(local_path))
+        response = self.minio_client.get_object(
+            bucket_name=bucket_name,
+            object_name=object_name
+        )
+        try:
+            with open(local_path, 'wb') as f:
+                shutil.copyfileobj(response, f, length=chunk)
+        finally:
+            # 归还连接，避免连接池被未释放的response耗尽
+            response.close()
+            response.release_conn()
+
+        log_config.app_logger.info(f"文件已保存到: {local_path}")
+
     def download_file_to_local(self, object_name: str, local_path: str, bucket_name: str = None) -> bool:
         """
         从MinIO下载文件到本地
@@ -92,17 +156,8 @@ class MinioFileDownloader:
             下载是否成功
         """
         try:
-            # 下载文件内容
-            file_data = self.download_file_to_bytes(object_name, bucket_name)
-            
-            # 确保目标目录存在
-            os.makedirs(os.path.dirname(local_path), exist_ok=True)
-            
-            # 保存到本地文件
-            with open(local_path, 'wb') as f:
-                f.write(file_data)
-            
-            log_config.app_logger.info(f"文件已保存到: {local_path}")
+            # 流式写盘，不在内存中物化完整文件
+            self.download_object_to_path(object_name, local_path, bucket_name)
             return True
             
         except Exception as e:
@@ -124,18 +179,18 @@ class MinioFileDownloader:
             object_name (包含文件夹路径)
         """
         try:
-            parsed_url = urlparse(file_url)
-            path_parts = parsed_url.path.strip('/').split('/')
-            
-            if len(path_parts) >= 3:
-                # 格式: /bucket_name/folder/filename
-                # 取bucket_name之后的所有部分作为object_name (包含文件夹路径)
-                object_name = '/'.join(path_parts[1:])
-                log_config.app_logger.info(f"从URL提取object_name: {object_name}")
-                return object_name
-            else:
+            m = _URL_OBJ_RE.match(file_url)
+            # 格式: /bucket_name/folder/filename，object_name需包含文件夹路径
+            if not m or '/' not in m.group(1):
                 raise ValueError(f"URL格式不正确，无法解析object_name: {file_url}")
-                
+
+            object_name = m.group(1)
+            # 仅在出现百分号编码时才解码，常见纯ASCII路径不额外分配
+            if '%' in object_name:
+                object_name = unquote(object_name)
+            log_config.app_logger.info(f"从URL提取object_name: {object_name}")
+            return object_name
+
         except Exception as e:
             log_config.app_logger.error(f"解析URL失败: {e}")
             raise
@@ -154,26 +209,148 @@ class MinioFileDownloader:
         try:
             # 提取object_name
             object_name = self.extract_object_name_from_url(file_url)
-            
-            # 下载文件
-            file_data = self.download_file_to_bytes(object_name)
-            
-            # 如果指定了本地路径，保存到本地
+
+            # 指定了本地路径时直接流式落盘再回读：磁盘页缓存里的回读
+            # 远比在内存里长期持有两份拷贝便宜
             if local_path:
-                os.makedirs(os.path.dirname(local_path), exist_ok=True)
-                with open(local_path, 'wb') as f:
-                    f.write(file_data)
-                log_config.app_logger.info(f"文件已保存到: {local_path}")
-            
-            return file_data
+                self.download_object_to_path(object_name, local_path)
+                with open(local_path, 'rb') as f:
+                    return f.read()
+
+            return self.download_file_to_bytes(object_name)
             
         except Exception as e:
             log_config.app_logger.error(f"通过URL下载文件失败: {e}")
             raise
 
+    def download_object_to_path_parallel(self, object_name: str, local_path: str,
+                                         bucket_name: str = None,
+                                         chunk: int = 4 * 1024 * 1024,
+                                         workers: int = 8) -> str:
+        """
+        大对象分片并行下载：按字节区间并发GET，直接写入预分配文件
+
+        单条连接往往吃不满链路带宽；把对象切成区间由多条连接同时拉，
+        吞吐随并发近线性提升。小于一个分片的对象直接走普通流式下载。
+
+        Args:
+            object_name: 对象名称
+            local_path: 本地保存路径
+            bucket_name: 桶名称
+            chunk: 分片大小，默认4MiB
+            workers: 最大并发分片数
+
+        Returns:
+            本地文件路径
+        """
+        if bucket_name is None:
+            bucket_name = self.config.bucket_name
+
+        total = self.minio_client.stat_object(bucket_name, object_name).size
+        if total <= chunk:
+            self.download_object_to_path(object_name, local_path, bucket_name, chunk)
+            return local_path
+
+        _ensure_dir(os.path.dirname(local_path))
+        # 预分配目标文件，各分片按偏移pwrite互不相扰，无需写锁
+        with open(local_path, 'wb') as f:
+            f.truncate(total)
+
+        fd = os.open(local_path, os.O_WRONLY)
+        try:
+            # 真正预留磁盘块（truncate只改长度、留洞），乱序的分片写
+            # 不再触发块延迟分配，也提前暴露磁盘空间不足
+            if hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(fd, 0, total)
+                except OSError:
+                    pass  # 个别文件系统不支持，写入仍然正确
+
+            def _fetch_range(offset: int) -> None:
+                length = min(chunk, total - offset)
+                response = self.minio_client.get_object(
+                    bucket_name=bucket_name,
+                    object_name=object_name,
+                    offset=offset,
+                    length=length
+                )
+                try:
+                    pos = offset
+                    while True:
+                        buf = response.read(1 << 20)
+                        if not buf:
+                            break
+                        os.pwrite(fd, buf, pos)
+                        pos += len(buf)
+                finally:
+                    response.close()
+                    response.release_conn()
+
+            offsets = range(0, total, chunk)
+            with ThreadPoolExecutor(max_workers=min(workers, len(offsets))) as executor:
+                # 消费所有结果，任一分片异常在此抛出
+                for _ in executor.map(_fetch_range, offsets):
+                    pass
+        finally:
+            os.close(fd)
+
+        log_config.app_logger.info(f"分片并行下载完成: {object_name} -> {local_path} ({total} 字节)")
+        return local_path
+
+    def download_by_url_to_path(self, file_url: str, local_path: str) -> str:
+        """
+        通过URL把对象直接下载到本地路径（不经内存缓冲）
+
+        fget_object由客户端流式写盘（先写part文件再原子改名），
+        全程不在内存里物化对象内容。
+
+        Args:
+            file_url: 文件URL
+            local_path: 本地保存路径
+
+        Returns:
+            本地文件路径
+        """
+        object_name = self.extract_object_name_from_url(file_url)
+        _ensure_dir(os.path.dirname(local_path))
+        self.minio_client.fget_object(self.config.bucket_name, object_name, local_path)
+        log_config.app_logger.info(f"文件已保存到: {local_path}")
+        return local_path
+
+    def iter_objects(self, bucket_name: str = None, prefix: str = "", start_after: str = None,
+                     suffix: str = None):
+        """
+        按前缀流式迭代桶中的对象名
+
+        生成器直通SDK的分页列举：调用方用next/islice只取前若干个时，
+        后续分页根本不会发起，内存占用也与结果总数无关。
+
+        Args:
+            bucket_name: 桶名称
+            prefix: 前缀过滤（服务端过滤）
+            start_after: 从该键之后开始列举
+            suffix: 后缀过滤（客户端逐项过滤，如'.docx'；
+                找首个匹配项时命中页之后的分页不会再拉取）
+
+        Yields:
+            对象名
+        """
+        if bucket_name is None:
+            bucket_name = self.config.bucket_name
+
+        objects = self.minio_client.list_objects(
+            bucket_name=bucket_name,
+            prefix=prefix,
+            recursive=True,
+            start_after=start_after
+        )
+        for obj in objects:
+            if suffix is None or obj.object_name.endswith(suffix):
+                yield obj.object_name
+
     def list_objects(self, bucket_name: str = None, prefix: str = "") -> list:
         """
-        列出桶中的对象
+        列出桶中的对象（一次性物化为列表）
         
         Args:
             bucket_name: 桶名称
@@ -182,32 +359,24 @@ class MinioFileDownloader:
         Returns:
             对象列表
         """
-        if bucket_name is None:
-            bucket_name = self.config.bucket_name
-
         try:
-            objects = self.minio_client.list_objects(
-                bucket_name=bucket_name,
-                prefix=prefix,
-                recursive=True
-            )
-            return [obj.object_name for obj in objects]
+            return list(self.iter_objects(bucket_name, prefix))
         except Exception as e:
             log_config.app_logger.error(f"列出对象时发生错误: {e}")
             return []
 
 
+@lru_cache(maxsize=1)
 def get_minio_config() -> MinioConfig:
     """
-    从配置文件或环境变量获取MinIO配置
+    从配置文件或环境变量获取MinIO配置（进程内只解析一次）
     
     Returns:
         MinioConfig对象
     """
-    # 首先尝试从配置文件获取
+    # 首先尝试从配置文件获取，没有则回落到环境变量；默认值在MinioConfig
+    # 构造里统一兜底，不再重复组装一遍带默认值的字典
     minio_config = CONFIG.get('minio', {})
-    
-    # 如果配置文件没有，尝试从环境变量获取
     if not minio_config:
         minio_config = {
             "endpoint": os.getenv("MINIO_ENDPOINT", "172.18.1.7:9700"),
@@ -218,21 +387,31 @@ def get_minio_config() -> MinioConfig:
             "bucket_name": os.getenv("MINIO_BUCKET_NAME", "cedc-smart-apps"),
             "tmp_bucket_name": os.getenv("MINIO_TMP_BUCKET_NAME", "cedc-smart-apps-tmp-dir")
         }
-    
-    # 确保配置完整性
-    config_dict = {
-        "endpoint": minio_config.get("endpoint", "172.18.1.7:9700"),
-        "access_key": minio_config.get("access_key", ""),
-        "secret_key": minio_config.get("secret_key", ""),
-        "schema": minio_config.get("schema", False),
-        "cert_check": minio_config.get("cert_check", True),
-        "bucket_name": minio_config.get("bucket_name", "cedc-smart-apps"),
-        "tmp_bucket_name": minio_config.get("tmp_bucket_name", "cedc-smart-apps-tmp-dir")
-    }
-    
-    log_config.app_logger.info(f"MinIO配置: endpoint={config_dict['endpoint']}, bucket={config_dict['bucket_name']}")
-    
-    return MinioConfig(config_dict)
+
+    config = MinioConfig(minio_config)
+    # lru_cache保证整条日志每个进程只打一次
+    log_config.app_logger.info(f"MinIO配置: endpoint={config.endpoint}, bucket={config.bucket_name}")
+    return config
+
+
+@lru_cache(maxsize=1)
+def _get_downloader() -> MinioFileDownloader:
+    """
+    获取进程内共享的MinIO下载器
+
+    每次下载都新建Minio客户端会反复付TLS/TCP握手和连接池初始化的成本；
+    这里只构建一次，底层换成调过参的urllib3连接池，keep-alive连接在
+    多次下载间复用，重试也统一在连接层处理。
+    """
+    config = get_minio_config()
+    pool = urllib3.PoolManager(
+        num_pools=16,
+        maxsize=64,
+        block=False,
+        retries=urllib3.Retry(total=3, backoff_factor=0.2),
+        timeout=urllib3.Timeout(connect=5.0, read=300.0),
+    )
+    return MinioFileDownloader(config, http_client=pool)
 
 
 def download_file_from_minio(file_location: str, local_path: str) -> bool:
@@ -249,12 +428,10 @@ def download_file_from_minio(file_location: str, local_path: str) -> bool:
     try:
         log_config.app_logger.info(f"开始从MinIO下载文件: {file_location} -> {local_path}")
         
-        # 获取MinIO配置和下载器
-        minio_config = get_minio_config()
-        downloader = MinioFileDownloader(minio_config)
-        
-        # 通过URL下载文件
-        downloader.download_by_url(file_location, local_path)
+        # 使用进程内共享的下载器，复用连接池；只要落盘的场景走
+        # fget_object直写路径，不再为无人使用的返回值回读一遍文件
+        downloader = _get_downloader()
+        downloader.download_by_url_to_path(file_location, local_path)
         
         log_config.app_logger.info(f"MinIO文件下载完成: {local_path}")
         return True
@@ -264,90 +441,232 @@ def download_file_from_minio(file_location: str, local_path: str) -> bool:
         return False
 
 
+# 单飞下载去重：file_list里同一对象出现多次（或多个任务同时要同一文件）
+# 时，只有第一个调用真正发起下载，其余等它完成后共享结果
+_inflight_lock = threading.Lock()
+_inflight: Dict[str, threading.Event] = {}
+_inflight_results: Dict[str, Optional[str]] = {}
+_INFLIGHT_RESULTS_MAX = 512
+
+
 def ensure_file_exists(file_name: str, file_location: str, knowledge_dir: str) -> Optional[str]:
     """
     确保文件存在，如果本地没有则从MinIO下载
-    
+
+    对同一目标路径的并发调用做单飞去重：后到者等待先到者的下载结果，
+    N个重复请求只产生一次网络取回。
+
     Args:
         file_name: 文件名
         file_location: 文件下载URL
         knowledge_dir: 知识库目录路径
-        
+
     Returns:
         本地文件路径，如果失败返回None
     """
-    # 构建本地文件路径
     local_file_path = os.path.join(knowledge_dir, file_name)
-    
-    # 检查本地文件是否存在
-    if os.path.exists(local_file_path):
-        log_config.app_logger.info(f"本地文件已存在: {local_file_path}")
-        return local_file_path
-    
-    # 本地文件不存在，尝试从MinIO下载
-    log_config.app_logger.info(f"本地文件不存在，尝试从MinIO下载: {file_name}")
-    
+
+    with _inflight_lock:
+        event = _inflight.get(local_file_path)
+        if event is not None:
+            is_owner = False
+        else:
+            event = threading.Event()
+            _inflight[local_file_path] = event
+            is_owner = True
+
+    if not is_owner:
+        # 等首个调用完成并直接复用其结果
+        event.wait()
+        return _inflight_results.get(local_file_path)
+
+    try:
+        result = _ensure_file_exists(file_name, file_location, knowledge_dir, local_file_path)
+        if len(_inflight_results) >= _INFLIGHT_RESULTS_MAX:
+            _inflight_results.clear()
+        _inflight_results[local_file_path] = result
+        return result
+    finally:
+        with _inflight_lock:
+            _inflight.pop(local_file_path, None)
+        event.set()
+
+
+def _ensure_file_exists(file_name: str, file_location: str, knowledge_dir: str,
+                        local_file_path: str) -> Optional[str]:
+    """ensure_file_exists的实际检查/下载逻辑"""
+    etag_path = f"{local_file_path}.etag"
+
+    # 一次HEAD拿到远端etag和大小：本地副本对得上就直接复用，把整对象
+    # GET压成一次KB级元数据请求；HEAD失败不妨碍后续正常下载
+    remote_etag = None
+    remote_size = None
+    try:
+        downloader = _get_downloader()
+        object_name = downloader.extract_object_name_from_url(file_location)
+        stat = downloader.minio_client.stat_object(downloader.config.bucket_name, object_name)
+        remote_etag, remote_size = stat.etag, stat.size
+    except Exception as e:
+        log_config.app_logger.warning(f"获取远端对象元数据失败: {file_name}, 错误: {str(e)}")
+
+    # 检查本地文件是否存在（isfile顺带排除同名目录）
+    if os.path.isfile(local_file_path):
+        if remote_etag is None:
+            # 远端元数据不可用时沿用本地副本，保持原有行为
+            log_config.app_logger.info(f"本地文件已存在: {local_file_path}")
+            return local_file_path
+
+        cached_etag = None
+        try:
+            with open(etag_path, 'r', encoding='utf-8') as f:
+                cached_etag = f.read().strip()
+        except OSError:
+            pass
+
+        if cached_etag == remote_etag and os.path.getsize(local_file_path) == remote_size:
+            log_config.app_logger.info(f"本地文件与远端一致，跳过下载: {local_file_path}")
+            return local_file_path
+
+        # 本地副本已过期（或没有etag记录），重新下载覆盖
+        log_config.app_logger.info(f"本地文件与远端不一致，重新下载: {file_name}")
+    else:
+        # 本地文件不存在，尝试从MinIO下载
+        log_config.app_logger.info(f"本地文件不存在，尝试从MinIO下载: {file_name}")
+
     if download_file_from_minio(file_location, local_file_path):
+        # 记录etag旁车文件，供下次的一致性校验直接比对
+        if remote_etag is not None:
+            try:
+                with open(etag_path, 'w', encoding='utf-8') as f:
+                    f.write(remote_etag)
+            except OSError as e:
+                log_config.app_logger.warning(f"写入etag记录失败: {etag_path}, 错误: {str(e)}")
         return local_file_path
     else:
         log_config.app_logger.error(f"文件下载失败: {file_name}")
         return None
 
 
-def process_file_list(file_list: list, knowledge_dir: str) -> list:
+def process_file_list(file_list: list, knowledge_dir: str, max_workers: int = None) -> list:
     """
     处理文件列表，确保所有文件都可用
     
     Args:
         file_list: 文件信息列表，每个元素应包含file_name, file_location等字段
         knowledge_dir: 知识库目录路径
+        max_workers: 下载并发度；缺省时取FILE_DOWNLOAD_MAX_WORKERS环境变量
+            （便于压测时扫不同并发），否则为32
         
     Returns:
         可用的文件路径列表
     """
-    available_files = []
-    
+    # 先做入参校验，攒出待处理任务列表；下载彼此独立，串行时总耗时是
+    # 逐个RTT+传输之和，这里用线程池并发发起，共享连接池摊薄TLS开销
+    tasks = []
     for file_info in file_list:
         if isinstance(file_info, dict):
             file_name = file_info.get('file_name', '')
             file_location = file_info.get('file_location', '')
-            
+
             if file_name and file_location:
-                # 确保文件存在
-                local_path = ensure_file_exists(file_name, file_location, knowledge_dir)
-                
-                if local_path:
-                    available_files.append(local_path)
-                    log_config.app_logger.info(f"文件准备就绪: {file_name}")
-                else:
-                    log_config.app_logger.error(f"文件不可用: {file_name}")
+                tasks.append((file_name, file_location))
             else:
                 log_config.app_logger.warning(f"文件信息不完整: {file_info}")
         else:
             log_config.app_logger.warning(f"无效的文件信息格式: {file_info}")
-    
-    return available_files
+
+    if not tasks:
+        return []
+
+    # 并发度与共享连接池容量对齐；本地stat也一并进池，命中缓存时同样并行
+    results: list = [None] * len(tasks)
+    if max_workers is None:
+        max_workers = int(os.getenv('FILE_DOWNLOAD_MAX_WORKERS', 32))
+    max_workers = max(1, min(max_workers, len(tasks)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_idx = {
+            executor.submit(ensure_file_exists, file_name, file_location, knowledge_dir): idx
+            for idx, (file_name, file_location) in enumerate(tasks)
+        }
+        for future in as_completed(future_to_idx):
+            idx = future_to_idx[future]
+            file_name = tasks[idx][0]
+            local_path = future.result()
+            results[idx] = local_path
+            if local_path:
+                log_config.app_logger.info(f"文件准备就绪: {file_name}")
+            else:
+                log_config.app_logger.error(f"文件不可用: {file_name}")
+
+    # 按入参顺序返回可用文件
+    return [local_path for local_path in results if local_path]
+
+
+async def process_file_list_async(file_list: list, knowledge_dir: str, max_concurrency: int = 16) -> list:
+    """
+    process_file_list 的并发版本，供 async 路由直接 await。
+
+    每个文件的"检查本地/下载"在线程池中执行并用 asyncio.gather 并发发起，
+    将 N 个文件的串行往返压缩为一批并行请求；Semaphore 限制同时进行的
+    下载数，避免打爆 MinIO 连接。返回结果与入参顺序一致。
+
+    Args:
+        file_list: 文件信息列表，每个元素应包含file_name, file_location等字段
+        knowledge_dir: 知识库目录路径
+        max_concurrency: 最大并发下载数
+
+    Returns:
+        可用的文件路径列表
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _ensure_one(file_info) -> Optional[str]:
+        if not isinstance(file_info, dict):
+            log_config.app_logger.warning(f"无效的文件信息格式: {file_info}")
+            return None
+
+        file_name = file_info.get('file_name', '')
+        file_location = file_info.get('file_location', '')
+
+        if not (file_name and file_location):
+            log_config.app_logger.warning(f"文件信息不完整: {file_info}")
+            return None
+
+        async with semaphore:
+            local_path = await asyncio.to_thread(ensure_file_exists, file_name, file_location, knowledge_dir)
+
+        if local_path:
+            log_config.app_logger.info(f"文件准备就绪: {file_name}")
+        else:
+            log_config.app_logger.error(f"文件不可用: {file_name}")
+        return local_path
+
+    results = await asyncio.gather(*(_ensure_one(file_info) for file_info in file_list))
+    return [local_path for local_path in results if local_path]
 
 
 if __name__ == "__main__":
     """测试MinIO下载功能"""
-    
+    import sys
+
+    # 脚本直跑时补上项目根目录；正常包内导入不需要这一步的路径stat
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
     # 创建test目录
     os.makedirs("test", exist_ok=True)
     
     log_config.app_logger.info("MinIO文件下载测试脚本")
     
     try:
-        # 获取MinIO配置
-        config = get_minio_config()
-        downloader = MinioFileDownloader(config)
+        # 获取共享下载器
+        downloader = _get_downloader()
         
         # 测试1: 列出桶中的文件
         log_config.app_logger.info("=== 列出桶中的文件 ===")
         objects = downloader.list_objects()
-        log_config.app_logger.info(f"找到 {len(objects)} 个文件:")
-        for obj in objects[:10]:  # 只显示前10个
-            log_config.app_logger.info(f"  - {obj}")
+        # 一次性拼好再写一条日志，避免循环里逐行提交日志记录
+        preview = '\n'.join(f"  - {obj}" for obj in objects[:10])  # 只显示前10个
+        log_config.app_logger.info(f"找到 {len(objects)} 个文件:\n{preview}")
         
         # 测试2: 测试特定文件下载
         test_url = "http://172.18.1.7:9700/cedc-smart-apps/ccla99ab1b5544e297650f0f33c653b7/6able2f9c5aa2ac7cb772531e6880d83_d0635d16840f42e7ab7623da516d9ad4.docx"
@@ -1,24 +1,121 @@
 # -*- coding: utf-8 -*-
 #  author: ict
 import io
+import multiprocessing
 import os
+import re
 import tempfile
-from bs4 import BeautifulSoup
+import threading
+from concurrent.futures import ProcessPoolExecutor
 
 import PyPDF2
 import docx
 from fastapi import FastAPI, UploadFile
+from lxml import html as lxml_html
 
 from config.log_config import app_logger
 from utils.converted2html_util import DocumentConverter
 
 app = FastAPI(title="文件文本提取器", description="从上传的DOCX和PDF文件中提取文本内容")
 
+# PDFium（C++）按页取文本比PyPDF2的纯Python解码快一个量级以上；
+# 环境里没装时回落到原有PyPDF2路径
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+# 页数超过该阈值时把页区间分片到进程池并行提取
+_PDF_PROCESS_POOL_THRESHOLD = 64
+
+# 进程池惰性创建、全进程复用，且必须用spawn：服务进程里常驻多个线程
+# （线程池、预热、下载），fork出的子进程会继承锁状态随机死锁
+_PDF_POOL_WORKERS = min(os.cpu_count() or 1, 8)
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    if _pdf_pool is None:
+        with _pdf_pool_lock:
+            if _pdf_pool is None:
+                _pdf_pool = ProcessPoolExecutor(
+                    max_workers=_PDF_POOL_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _pdf_pool
+
+
+def _as_bytes(file_content) -> bytes:
+    """把bytes/缓冲对象/可seek文件对象统一物化为bytes（仅在必须时）"""
+    if isinstance(file_content, (bytes, bytearray)):
+        return bytes(file_content)
+    try:
+        # mmap等支持缓冲协议的对象零散页直接拷出
+        return bytes(file_content)
+    except TypeError:
+        file_content.seek(0)
+        return file_content.read()
+
+
+def _pdfium_range_text(args) -> str:
+    """提取指定页区间的文本（顶层函数，可被进程池pickle）"""
+    data, start, end = args
+    pdf = pdfium.PdfDocument(data)
+    try:
+        return "\n".join(pdf[i].get_textpage().get_text_range() for i in range(start, end))
+    finally:
+        pdf.close()
+
+
+def _extract_pdf_pypdfium2(data) -> str:
+    """用pypdfium2提取PDF全文，大文档按页区间分片到多进程"""
+    pdf = pdfium.PdfDocument(data)
+    try:
+        total = len(pdf)
+        if total <= _PDF_PROCESS_POOL_THRESHOLD:
+            return "\n".join(pdf[i].get_textpage().get_text_range() for i in range(total)) + "\n"
+    finally:
+        pdf.close()
 
-def extract_text_from_pdf(file_content: bytes) -> str:
-    """从PDF文件内容中提取文本"""
+    # 区间数等于worker数：每个worker恰好领一个任务，文档字节只被
+    # pickle一次/worker，也只重开一次文档；进程池参数要可pickle，
+    # 此处才把输入物化为bytes
+    payload = _as_bytes(data)
+    step = -(-total // _PDF_POOL_WORKERS)
+    ranges = [(payload, start, min(start + step, total)) for start in range(0, total, step)]
+    return "\n".join(_get_pdf_pool().map(_pdfium_range_text, ranges)) + "\n"
+
+# 空白清理：连续空格/制表符或空行压成单个换行，一趟sub替代
+# 原先逐行strip+split的多层生成器链
+_CLEAN_WS_RE = re.compile(r'[ \t]{2,}|\n\s*\n+')
+
+
+def _html_to_clean_text(html_content: str) -> str:
+    """
+    从HTML中提取干净的纯文本
+
+    用lxml（C实现）解析并取text_content，替代纯Python的soup遍历；
+    大文档上解析是提取的主要开销。
+    """
+    tree = lxml_html.fromstring(html_content)
+    for bad in tree.xpath('//script | //style'):
+        bad.getparent().remove(bad)
+    body = tree.find('.//body')
+    scope = body if body is not None else tree
+    return _CLEAN_WS_RE.sub('\n', scope.text_content()).strip()
+
+
+def extract_text_from_pdf(file_content) -> str:
+    """从PDF文件内容（bytes或可seek的文件对象）中提取文本"""
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+        if pdfium is not None:
+            return _extract_pdf_pypdfium2(file_content)
+
+        # PdfReader接受任意可seek文件对象，bytes才包一层BytesIO
+        stream = io.BytesIO(file_content) if isinstance(file_content, (bytes, bytearray)) else file_content
+        pdf_reader = PyPDF2.PdfReader(stream)
         text = ""
         for page_num in range(len(pdf_reader.pages)):
             text += pdf_reader.pages[page_num].extract_text() + "\n"
@@ -29,10 +126,11 @@ def extract_text_from_pdf(file_content: bytes) -> str:
         return ""
 
 
-def extract_text_from_docx(file_content: bytes) -> str:
-    """从DOCX文件内容中提取文本"""
+def extract_text_from_docx(file_content) -> str:
+    """从DOCX文件内容（bytes或可seek的文件对象）中提取文本"""
     try:
-        doc = docx.Document(io.BytesIO(file_content))
+        stream = io.BytesIO(file_content) if isinstance(file_content, (bytes, bytearray)) else file_content
+        doc = docx.Document(stream)
         text = "\n".join([para.text for para in doc.paragraphs])
         return text
     except Exception as e:
@@ -41,41 +139,41 @@ def extract_text_from_docx(file_content: bytes) -> str:
         return ""
 
 
-def extract_text_from_wps(file_content: bytes) -> str:
+# 临时文件优先放内存盘：转换器只认文件路径，绕不开落盘这一步，
+# 但tmpfs上的写入只是内存拷贝，省掉大文档的磁盘写+回读
+_TMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
+def _extract_via_html(file_content: bytes, suffix: str, type_name: str) -> str:
     """
-    从WPS文件内容中提取文本
-    采用迂回方式：先将WPS文件转换为HTML，再从HTML中提取文本
+    经HTML迂回提取文本：落临时文件 -> 转HTML -> 提取纯文本
+
+    WPS/WPT等Spire才认识的格式共用这条路径。
+
+    Args:
+        file_content: 文件内容
+        suffix: 临时文件后缀（决定转换器识别的格式）
+        type_name: 日志里展示的格式名
     """
     temp_file_path = None
     try:
-        # 创建临时文件保存WPS内容
-        with tempfile.NamedTemporaryFile(suffix='.wps', delete=False) as temp_file:
+        # 创建临时文件保存文档内容（buffering=0直写，不经用户态缓冲）
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False,
+                                         dir=_TMP_DIR, buffering=0) as temp_file:
             temp_file.write(file_content)
             temp_file_path = temp_file.name
 
-        # 使用DocumentConverter将WPS转换为HTML
+        # 使用DocumentConverter转换为HTML
         html_content = DocumentConverter.convert_word_to_html(temp_file_path)
-        
-        # 使用BeautifulSoup从HTML中提取纯文本
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # 移除script和style标签
-        for script in soup(["script", "style"]):
-            script.decompose()
-            
-        # 提取文本内容
-        text = soup.get_text()
-        
-        # 清理文本：移除多余的空白字符
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        app_logger.info(f"WPS文件文本提取成功，提取文本长度: {len(text)}")
+
+        # 用lxml从HTML中提取并清理纯文本
+        text = _html_to_clean_text(html_content)
+
+        app_logger.info(f"{type_name}文件文本提取成功，提取文本长度: {len(text)}")
         return text
-        
+
     except Exception as e:
-        error_msg = f"WPS处理错误: {str(e)}"
+        error_msg = f"{type_name}处理错误: {str(e)}"
         app_logger.error(error_msg)
         return ""
     finally:
@@ -87,56 +185,41 @@ def extract_text_from_wps(file_content: bytes) -> str:
                 app_logger.warning(f"删除临时文件失败: {str(e)}")
 
 
+def extract_text_from_wps(file_content: bytes) -> str:
+    """从WPS文件内容中提取文本（经HTML迂回）"""
+    return _extract_via_html(file_content, '.wps', 'WPS')
+
+
 def extract_text_from_wpt(file_content: bytes) -> str:
-    """
-    从WPT文件内容中提取文本
-    采用迂回方式：先将WPT文件转换为HTML，再从HTML中提取文本
-    """
-    temp_file_path = None
-    try:
-        # 创建临时文件保存WPT内容
-        with tempfile.NamedTemporaryFile(suffix='.wpt', delete=False) as temp_file:
-            temp_file.write(file_content)
-            temp_file_path = temp_file.name
+    """从WPT文件内容中提取文本（经HTML迂回）"""
+    return _extract_via_html(file_content, '.wpt', 'WPT')
 
-        # 使用DocumentConverter将WPT转换为HTML
-        html_content = DocumentConverter.convert_word_to_html(temp_file_path)
-        
-        # 使用BeautifulSoup从HTML中提取纯文本
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # 移除script和style标签
-        for script in soup(["script", "style"]):
-            script.decompose()
-            
-        # 提取文本内容
-        text = soup.get_text()
-        
-        # 清理文本：移除多余的空白字符
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        app_logger.info(f"WPT文件文本提取成功，提取文本长度: {len(text)}")
-        return text
-        
-    except Exception as e:
-        error_msg = f"WPT处理错误: {str(e)}"
-        app_logger.error(error_msg)
-        return ""
-    finally:
-        # 清理临时文件
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-            except Exception as e:
-                app_logger.warning(f"删除临时文件失败: {str(e)}")
+
+# 扩展名 -> (提取函数, 文件类型标识)。一次splitext+字典查找完成分发，
+# 替代两处重复的endswith链；新增格式只需在表里加一行
+_EXTRACTORS = {
+    '.pdf': (extract_text_from_pdf, 'PDF'),
+    '.docx': (extract_text_from_docx, 'DOCX'),
+    '.docm': (extract_text_from_docx, 'DOCX'),
+    '.dotx': (extract_text_from_docx, 'DOCX'),
+    '.dotm': (extract_text_from_docx, 'DOCX'),
+    '.wps': (extract_text_from_wps, 'WPS'),
+    '.wpt': (extract_text_from_wpt, 'WPT'),
+}
+
+# 这两类需要先物化为bytes（要落临时文件），其余格式直接吃文件对象
+_BYTES_ONLY_TYPES = ('WPS', 'WPT')
 
 
 # 在 file_text_extractor_util.py 中添加
 
-def extract_text_from_upload_file(file: UploadFile) -> dict:
-    """从 UploadFile 对象中提取文本内容，不影响原文件指针"""
+def extract_text_from_upload_file(file: UploadFile, include_full_text: bool = True) -> dict:
+    """从 UploadFile 对象中提取文本内容，不影响原文件指针
+
+    Args:
+        file: 上传文件对象
+        include_full_text: 只需要预览时传False，响应里不再携带全文副本
+    """
     try:
         # 使用 file.file 直接操作底层文件对象，避免异步调用
         file_obj = file.file
@@ -147,38 +230,33 @@ def extract_text_from_upload_file(file: UploadFile) -> dict:
         # 重置到开始位置
         file_obj.seek(0)
 
-        # 读取文件内容
-        contents = file_obj.read()
-
-        # 重置文件指针到原始位置
-        file_obj.seek(current_position)
-
-        # 根据文件扩展名选择适当的提取方法
-        if file.filename.endswith('.pdf'):
-            text = extract_text_from_pdf(contents)
-            file_type = "PDF"
-        elif file.filename.endswith(('.docx', '.docm', '.dotx', '.dotm')):
-            text = extract_text_from_docx(contents)
-            if not text:
+        # PDF/DOCX解析器接受可seek文件对象，直接传SpooledTemporaryFile，
+        # 不再read()出整份bytes再包BytesIO（峰值内存从约2倍降到1倍）；
+        # 只有需要落临时文件的WPS/WPT路径才物化内容
+        try:
+            # 按扩展名查表分发
+            ext = os.path.splitext(file.filename)[1].lower()
+            extractor, file_type = _EXTRACTORS.get(ext, (None, ""))
+            if extractor is None:
+                text = ""
+            elif file_type in _BYTES_ONLY_TYPES:
+                text = extractor(file_obj.read())
+            else:
+                text = extractor(file_obj)
+            if file_type == "DOCX" and not text:
                 return {}
-            file_type = "DOCX"
-        elif file.filename.endswith('.wps'):
-            text = extract_text_from_wps(contents)
-            file_type = "WPS"
-        elif file.filename.endswith('.wpt'):
-            text = extract_text_from_wpt(contents)
-            file_type = "WPT"
-        else:
-            text = ""
-            file_type = ""
+        finally:
+            # 重置文件指针到原始位置
+            file_obj.seek(current_position)
 
-        # 构建响应
+        # 构建响应（长度只算一次，短文本预览直接复用原串不再切片拼接）
+        text_length = len(text)
         return {
             "filename": file.filename,
             "file_type": file_type,
-            "text_length": len(text),
-            "text_preview": text[:1000] + "..." if len(text) > 1000 else text,
-            "full_text": text
+            "text_length": text_length,
+            "text_preview": text[:1000] + "..." if text_length > 1000 else text,
+            "full_text": text if include_full_text else ""
         }
 
     except Exception as e:
@@ -193,33 +271,33 @@ def extract_text_from_upload_file(file: UploadFile) -> dict:
         }
 
 
-def extract_text_from_file_content(content: bytes, filename: str) -> dict:
-    """从文件内容字节流中提取文本内容"""
+def extract_text_from_file_content(content, filename: str, include_full_text: bool = True) -> dict:
+    """从文件内容（bytes或可seek文件对象）中提取文本内容
+
+    Args:
+        content: 文件内容
+        filename: 文件名（决定提取方式）
+        include_full_text: 只需要预览时传False，响应里不再携带全文副本
+    """
     try:
-        # 根据文件扩展名选择适当的提取方法
-        if filename.endswith('.pdf'):
-            text = extract_text_from_pdf(content)
-            file_type = "PDF"
-        elif filename.endswith(('.docx', '.docm', '.dotx', '.dotm')):
-            text = extract_text_from_docx(content)
-            file_type = "DOCX"
-        elif filename.endswith('.wps'):
-            text = extract_text_from_wps(content)
-            file_type = "WPS"
-        elif filename.endswith('.wpt'):
-            text = extract_text_from_wpt(content)
-            file_type = "WPT"
-        else:
+        # 按扩展名查表分发
+        ext = os.path.splitext(filename)[1].lower()
+        extractor, file_type = _EXTRACTORS.get(ext, (None, ""))
+        if extractor is None:
             text = ""
-            file_type = ""
+        elif file_type in _BYTES_ONLY_TYPES and not isinstance(content, (bytes, bytearray)):
+            text = extractor(_as_bytes(content))
+        else:
+            text = extractor(content)
 
-        # 构建响应
+        # 构建响应（长度只算一次，短文本预览直接复用原串不再切片拼接）
+        text_length = len(text)
         return {
             "filename": filename,
             "file_type": file_type,
-            "text_length": len(text),
-            "text_preview": text[:1000] + "..." if len(text) > 1000 else text,
-            "full_text": text
+            "text_length": text_length,
+            "text_preview": text[:1000] + "..." if text_length > 1000 else text,
+            "full_text": text if include_full_text else ""
         }
 
     except Exception as e:
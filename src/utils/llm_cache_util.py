@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""大模型输出的磁盘缓存工具"""
+
+import hashlib
+import os
+import time
+from typing import Optional
+
+from config.app_config import STATIC_FILE_PATH
+from config.log_config import app_logger
+
+# 缓存目录与过期时间：同样的(模型, 提示词, 输入)七天内直接复用上次输出，
+# 重复生成/重复分析完全不付推理成本
+_CACHE_DIR = os.path.join(STATIC_FILE_PATH, '.llm_cache')
+_CACHE_TTL_SECONDS = 7 * 86400
+
+
+def make_cache_key(model: str, system_prompt: str, user_content: str) -> str:
+    """
+    按(模型, 系统提示词, 用户输入)生成内容寻址的缓存键
+
+    Args:
+        model: 模型名称
+        system_prompt: 系统提示词
+        user_content: 用户消息内容
+
+    Returns:
+        sha256十六进制摘要
+    """
+    digest = hashlib.sha256()
+    for part in (model, system_prompt, user_content):
+        digest.update(part.encode('utf-8'))
+        # 字段间加分隔符，避免不同拼接方式撞出相同键
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def get(key: str) -> Optional[str]:
+    """读取缓存的模型输出，未命中或已过期返回None"""
+    path = os.path.join(_CACHE_DIR, key)
+    try:
+        if time.time() - os.stat(path).st_mtime > _CACHE_TTL_SECONDS:
+            os.remove(path)
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        app_logger.warning(f"读取LLM输出缓存失败 {key[:12]}: {str(e)}")
+        return None
+
+
+def put(key: str, value: str) -> None:
+    """写入模型输出缓存（尽力而为，失败只记日志不影响主流程）"""
+    try:
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        path = os.path.join(_CACHE_DIR, key)
+        # 先写临时文件再原子替换，多worker并发写也不会读到半截内容
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        app_logger.warning(f"写入LLM输出缓存失败 {key[:12]}: {str(e)}")
@@ -6,6 +6,15 @@ from schemas.paper_schemas import (
     QuestionOptionForFrontend
 )
 
+# 题目类型中英文对照；模块级常量，批量转换时也可直接查表
+# 而不必逐项走函数调用
+QUESTION_TYPE_ZH = {
+    'single_choice': '单选题',
+    'multiple_choice': '多选题',
+    'true_false': '判断题',
+    'fill_blank': '填空题'
+}
+
 
 def hide_correct_answers(questions: List[Dict[str, Any]]) -> List[QuestionForFrontend]:
     """
@@ -17,28 +26,23 @@ def hide_correct_answers(questions: List[Dict[str, Any]]) -> List[QuestionForFro
     Returns:
         隐藏正确答案的题目列表
     """
-    frontend_questions = []
-    
-    for question in questions:
-        # 处理选项，移除正确答案标识和解释
-        frontend_options = []
-        for option in question.get('options', []):
-            frontend_option = QuestionOptionForFrontend(
-                id=option.get('id', ''),
-                text=option.get('text', '')
-            )
-            frontend_options.append(frontend_option)
-        
-        # 创建前端题目对象
-        frontend_question = QuestionForFrontend(
-            question_id=question.get('question_id', ''),
+    # 推导式单趟构建，去掉逐项append的中间状态；只搬运需要暴露给
+    # 前端的字段，正确答案与解析自然被丢弃。
+    # 数据来自缓存/库里的已校验试卷，model_construct跳过Pydantic校验链
+    # （大卷上是这里的主要开销）；历史数据里的int型ID用str()显式归一
+    return [
+        QuestionForFrontend.model_construct(
+            question_id=str(question.get('question_id', '')),
             question_type=question.get('question_type', ''),
             question_text=question.get('question_text', ''),
-            options=frontend_options
+            options=[
+                QuestionOptionForFrontend.model_construct(
+                    id=str(option.get('id', '')), text=option.get('text', ''))
+                for option in question.get('options', [])
+            ]
         )
-        frontend_questions.append(frontend_question)
-    
-    return frontend_questions
+        for question in questions
+    ]
 
 
 def build_analysis_tasks_from_cache(
@@ -55,34 +59,33 @@ def build_analysis_tasks_from_cache(
     Returns:
         分析任务列表
     """
+    # 创建题目ID到题目的映射（推导式一趟建完）
+    question_map = {
+        str(question.get('question_id', '')): question
+        for question in cached_questions
+    }
+
+    # 遍历用户答案，构建分析任务；map查找和append绑定为局部名，
+    # 去掉热循环里重复的属性/方法解析
     analysis_tasks = []
-    
-    # 创建题目ID到题目的映射
-    question_map = {}
-    for question in cached_questions:
-        question_id = str(question.get('question_id', ''))
-        question_map[question_id] = question
-    
-    # 遍历用户答案，构建分析任务
+    append = analysis_tasks.append
+    lookup = question_map.get
     for user_answer in user_answers:
         question_id = str(user_answer.get('question_id', ''))
-        
-        if question_id not in question_map:
+
+        cached_question = lookup(question_id)
+        if cached_question is None:
             raise ValueError(f"题目ID {question_id} 在缓存中不存在")
-        
-        cached_question = question_map[question_id]
-        
+
         # 构建分析任务，保持用户答案的原始格式（字符串或列表）
-        analysis_task = {
+        append({
             "question_id": question_id,
             "question_type": cached_question.get('question_type', ''),
             "question_text": cached_question.get('question_text', ''),
             "user_answer": user_answer.get('user_answer', ''),  # 保持原始格式
             "options": cached_question.get('options', [])
-        }
-        
-        analysis_tasks.append(analysis_task)
-    
+        })
+
     return analysis_tasks
 
 
@@ -96,11 +99,4 @@ def convert_question_type_to_chinese(question_type: str) -> str:
     Returns:
         中文题目类型
     """
-    type_mapping = {
-        'single_choice': '单选题',
-        'multiple_choice': '多选题',
-        'true_false': '判断题',
-        'fill_blank': '填空题'
-    }
-    
-    return type_mapping.get(question_type, question_type) 
\ No newline at end of file
+    return QUESTION_TYPE_ZH.get(question_type, question_type)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""大模型调用限流工具"""
+
+import asyncio
+import functools
+import threading
+import time
+
+from config.app_config import get_config
+from config.log_config import app_logger
+
+
+class RateLimiter:
+    """请求数+token数双桶限流器
+
+    并发调大模型时，请求数(RPM)和token数(TPM)任一超限都会触发429，
+    随后的重试风暴反而让并发得不偿失。这里按墙钟时间持续回填两个桶，
+    任一桶不足时让调用方等待，保证在途流量贴着上限但不过线。
+
+    Attributes:
+        max_requests_per_minute: 每分钟最大请求数
+        max_tokens_per_minute: 每分钟最大token数
+    """
+
+    def __init__(self, max_requests_per_minute: int, max_tokens_per_minute: int):
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self._available_requests = float(max_requests_per_minute)
+        self._available_tokens = float(max_tokens_per_minute)
+        self._last_update_time = time.monotonic()
+        # 同时被异步任务和线程池里的同步调用方使用，用线程锁保护桶状态
+        self._lock = threading.Lock()
+
+    def _try_acquire(self, estimated_tokens: int):
+        """
+        尝试扣减容量
+
+        Returns:
+            成功返回None；容量不足返回建议的等待秒数
+        """
+        # 桶的回填封顶为每分钟上限，超过桶容量的请求永远凑不够配额，
+        # 会在acquire里无限自旋把线程/协程挂死。这里把请求钳到容量上限：
+        # 估算本就偏保守，超大请求等桶回满后放行，由端点侧实际限额兜底
+        if estimated_tokens > self.max_tokens_per_minute:
+            app_logger.warning(
+                f"token请求量{estimated_tokens}超过限流桶容量{self.max_tokens_per_minute}，"
+                f"已钳制到容量上限放行"
+            )
+            estimated_tokens = self.max_tokens_per_minute
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._last_update_time
+            self._last_update_time = now
+            # 按流逝时间回填，封顶为每分钟上限
+            self._available_requests = min(
+                self._available_requests + self.max_requests_per_minute * elapsed / 60.0,
+                float(self.max_requests_per_minute)
+            )
+            self._available_tokens = min(
+                self._available_tokens + self.max_tokens_per_minute * elapsed / 60.0,
+                float(self.max_tokens_per_minute)
+            )
+
+            if self._available_requests >= 1 and self._available_tokens >= estimated_tokens:
+                self._available_requests -= 1
+                self._available_tokens -= estimated_tokens
+                return None
+
+            # 估算补齐缺口需要的时间，给个下限避免空转
+            request_wait = (1 - self._available_requests) * 60.0 / self.max_requests_per_minute
+            token_wait = (estimated_tokens - self._available_tokens) * 60.0 / self.max_tokens_per_minute
+            return max(request_wait, token_wait, 0.05)
+
+    async def acquire(self, estimated_tokens: int = 0) -> None:
+        """异步获取配额，容量不足时挂起当前协程"""
+        while True:
+            wait_seconds = self._try_acquire(estimated_tokens)
+            if wait_seconds is None:
+                return
+            await asyncio.sleep(wait_seconds)
+
+    def acquire_sync(self, estimated_tokens: int = 0) -> None:
+        """同步获取配额，容量不足时阻塞当前线程"""
+        while True:
+            wait_seconds = self._try_acquire(estimated_tokens)
+            if wait_seconds is None:
+                return
+            time.sleep(wait_seconds)
+
+
+@functools.lru_cache(maxsize=1)
+def get_ai_rate_limiter() -> RateLimiter:
+    """
+    获取AI服务共用的限流器（进程级单例）
+
+    生成与分析服务打的是同一个模型端点，共享一个限流器才能
+    把两类流量合并计入同一RPM/TPM预算。
+    """
+    ai_config = get_config().get('ai_service', {})
+    limiter = RateLimiter(
+        max_requests_per_minute=ai_config.get('max_requests_per_minute', 60),
+        max_tokens_per_minute=ai_config.get('max_tokens_per_minute', 200000)
+    )
+    app_logger.info(
+        f"AI限流器初始化: {limiter.max_requests_per_minute} RPM, {limiter.max_tokens_per_minute} TPM"
+    )
+    return limiter
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 #  author: ict
 
-import json
+import orjson
 from typing import Dict
 
 USER_CHAT_STATE = "CHAT_STATUS"
@@ -30,25 +30,49 @@ class PaperTestStateProcessor:
     
 
     
+    # Lua脚本：单次往返完成 访问码->试题ID 映射与试题缓存的两级GET
+    # （第二个GET的键依赖第一个的结果，普通pipeline表达不了这种依赖）
+    _ACCESS_CODE_PAPER_LUA = """
+local paper_id = redis.call('GET', KEYS[1])
+if not paper_id then
+    return {false, false}
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+local paper_key = ARGV[2] .. paper_id
+local paper_data = redis.call('GET', paper_key)
+if paper_data then
+    redis.call('EXPIRE', paper_key, ARGV[1])
+end
+return {paper_id, paper_data}
+"""
+
     def __init__(self, redis_client):
         self.redis_client = redis_client
+        # register_script只做本地封装不发网络请求，脚本按sha在服务端复用
+        self._access_code_paper_script = redis_client.register_script(self._ACCESS_CODE_PAPER_LUA)
     
     def save_generated_paper(
             self,
             user_id: str,
             chat_id: str,
-            paper_data: dict
+            paper_data
     ) -> None:
         """
         保存生成的试卷信息到Redis
-        
+
         Args:
             user_id: 用户ID
             chat_id: 聊天会话ID
-            paper_data: 试卷数据
+            paper_data: 试卷数据，dict 或已经序列化好的 JSON 字符串
+                （调用方用 model_dump_json 预序列化时可避免一次 dict 中转）
         """
         cache_key = f"{self.PAPER_GENERATE_KEY}:{user_id}:{chat_id}"
-        paper_data_str = json.dumps(paper_data, ensure_ascii=False)
+        if isinstance(paper_data, (str, bytes)):
+            paper_data_str = paper_data
+        else:
+            # orjson直接产出UTF-8字节串存入Redis，比标准库json快数倍
+            # 且省掉str->bytes的一次编码
+            paper_data_str = orjson.dumps(paper_data, option=orjson.OPT_NON_STR_KEYS)
         self.redis_client.set(cache_key, paper_data_str, ex=self.PAPER_CACHE_TTL)
     
     def get_generated_paper(
@@ -67,11 +91,10 @@ class PaperTestStateProcessor:
             试卷数据，如果不存在则返回None
         """
         cache_key = f"{self.PAPER_GENERATE_KEY}:{user_id}:{chat_id}"
-        cached_data = self.redis_client.get(cache_key)
+        # GETEX一次往返完成取值+续期，替代get/expire两次RTT
+        cached_data = self.redis_client.getex(cache_key, ex=self.PAPER_CACHE_TTL)
         if cached_data:
-            # 刷新过期时间
-            self.redis_client.expire(cache_key, self.PAPER_CACHE_TTL)
-            return json.loads(cached_data)
+            return orjson.loads(cached_data)
         return None
     
     # 新增：共享试题相关方法
@@ -84,7 +107,7 @@ class PaperTestStateProcessor:
             paper_data: 试题数据
         """
         cache_key = f"{self.SHARED_PAPER_KEY}:{paper_id}"
-        paper_data_str = json.dumps(paper_data, ensure_ascii=False)
+        paper_data_str = orjson.dumps(paper_data, option=orjson.OPT_NON_STR_KEYS)
         self.redis_client.set(cache_key, paper_data_str, ex=self.SHARED_PAPER_TTL)
     
     def get_shared_paper(self, paper_id: str) -> Dict:
@@ -98,13 +121,26 @@ class PaperTestStateProcessor:
             试题数据，如果不存在则返回None
         """
         cache_key = f"{self.SHARED_PAPER_KEY}:{paper_id}"
-        cached_data = self.redis_client.get(cache_key)
+        # GETEX一次往返完成取值+续期
+        cached_data = self.redis_client.getex(cache_key, ex=self.SHARED_PAPER_TTL)
         if cached_data:
-            # 刷新过期时间
-            self.redis_client.expire(cache_key, self.SHARED_PAPER_TTL)
-            return json.loads(cached_data)
+            return orjson.loads(cached_data)
         return None
     
+    def reserve_access_code(self, access_code: str, paper_id: str) -> bool:
+        """
+        原子预占访问码映射（SET NX）
+
+        Args:
+            access_code: 访问码
+            paper_id: 试题ID
+
+        Returns:
+            True表示预占成功；False表示访问码已被其他试题占用
+        """
+        cache_key = f"{self.ACCESS_CODE_MAP_KEY}:{access_code}"
+        return bool(self.redis_client.set(cache_key, paper_id, nx=True, ex=self.SHARED_PAPER_TTL))
+
     def save_access_code_mapping(self, access_code: str, paper_id: str) -> None:
         """
         保存访问码到试题ID的映射
@@ -127,13 +163,71 @@ class PaperTestStateProcessor:
             试题ID，如果不存在则返回None
         """
         cache_key = f"{self.ACCESS_CODE_MAP_KEY}:{access_code}"
-        cached_data = self.redis_client.get(cache_key)
+        # GETEX一次往返完成取值+续期
+        cached_data = self.redis_client.getex(cache_key, ex=self.SHARED_PAPER_TTL)
         if cached_data:
-            # 刷新过期时间
-            self.redis_client.expire(cache_key, self.SHARED_PAPER_TTL)
             return cached_data.decode('utf-8') if isinstance(cached_data, bytes) else cached_data
         return None
     
+    def get_paper_with_access_code(self, access_code: str):
+        """
+        根据访问码一次往返取回(试题ID, 试题数据)
+
+        Args:
+            access_code: 访问码
+
+        Returns:
+            (paper_id, paper_data)元组，对应项未命中时为None；
+            两个键的过期时间均已刷新
+        """
+        mapping_key = f"{self.ACCESS_CODE_MAP_KEY}:{access_code}"
+        paper_id, paper_data = self._access_code_paper_script(
+            keys=[mapping_key],
+            args=[self.SHARED_PAPER_TTL, f"{self.SHARED_PAPER_KEY}:"]
+        )
+        if isinstance(paper_id, bytes):
+            paper_id = paper_id.decode('utf-8')
+        return paper_id, (orjson.loads(paper_data) if paper_data else None)
+
+    def get_papers_by_access_codes(self, access_codes: list) -> Dict:
+        """
+        批量根据访问码取回试题数据（两次MGET代替2N次GET）
+
+        Args:
+            access_codes: 访问码列表
+
+        Returns:
+            access_code -> 试题数据 的字典，映射或试题缓存未命中的
+            访问码不在其中；命中键的过期时间统一用pipeline刷新
+        """
+        if not access_codes:
+            return {}
+        code_keys = [f"{self.ACCESS_CODE_MAP_KEY}:{code}" for code in access_codes]
+        paper_ids = self.redis_client.mget(code_keys)
+
+        # 过滤未命中的映射，保留 访问码->试题ID 的对应关系
+        hits = []
+        for code, code_key, paper_id in zip(access_codes, code_keys, paper_ids):
+            if paper_id:
+                if isinstance(paper_id, bytes):
+                    paper_id = paper_id.decode('utf-8')
+                hits.append((code, code_key, paper_id))
+        if not hits:
+            return {}
+
+        paper_keys = [f"{self.SHARED_PAPER_KEY}:{paper_id}" for _, _, paper_id in hits]
+        payloads = self.redis_client.mget(paper_keys)
+
+        results = {}
+        pipe = self.redis_client.pipeline(transaction=False)
+        for (code, code_key, _), paper_key, payload in zip(hits, paper_keys, payloads):
+            pipe.expire(code_key, self.SHARED_PAPER_TTL)
+            if payload:
+                results[code] = orjson.loads(payload)
+                pipe.expire(paper_key, self.SHARED_PAPER_TTL)
+        pipe.execute()
+        return results
+
     def save_user_answer(self, paper_id: str, user_id: str, answer_data: dict) -> None:
         """
         保存用户答题记录到Redis
@@ -144,7 +238,7 @@ class PaperTestStateProcessor:
             answer_data: 答题数据
         """
         cache_key = f"{self.USER_ANSWER_KEY}:{paper_id}:{user_id}"
-        answer_data_str = json.dumps(answer_data, ensure_ascii=False)
+        answer_data_str = orjson.dumps(answer_data, option=orjson.OPT_NON_STR_KEYS)
         self.redis_client.set(cache_key, answer_data_str, ex=self.SHARED_PAPER_TTL)
     
     def get_user_answer(self, paper_id: str, user_id: str) -> Dict:
@@ -159,13 +253,39 @@ class PaperTestStateProcessor:
             答题数据，如果不存在则返回None
         """
         cache_key = f"{self.USER_ANSWER_KEY}:{paper_id}:{user_id}"
-        cached_data = self.redis_client.get(cache_key)
+        # GETEX一次往返完成取值+续期
+        cached_data = self.redis_client.getex(cache_key, ex=self.SHARED_PAPER_TTL)
         if cached_data:
-            # 刷新过期时间
-            self.redis_client.expire(cache_key, self.SHARED_PAPER_TTL)
-            return json.loads(cached_data)
+            return orjson.loads(cached_data)
         return None
     
+    def get_user_answers_batch(self, paper_id: str, user_ids: list) -> Dict:
+        """
+        批量获取用户答题记录（单次MGET代替N次GET）
+
+        Args:
+            paper_id: 试题ID
+            user_ids: 用户ID列表
+
+        Returns:
+            user_id -> 答题数据 的字典，缓存未命中的用户不在其中
+        """
+        if not user_ids:
+            return {}
+        cache_keys = [f"{self.USER_ANSWER_KEY}:{paper_id}:{user_id}" for user_id in user_ids]
+        cached_values = self.redis_client.mget(cache_keys)
+
+        results = {}
+        # 命中的键用pipeline一次刷新过期时间，与单条get的语义保持一致
+        pipe = self.redis_client.pipeline(transaction=False)
+        for user_id, cache_key, cached_data in zip(user_ids, cache_keys, cached_values):
+            if cached_data:
+                results[user_id] = orjson.loads(cached_data)
+                pipe.expire(cache_key, self.SHARED_PAPER_TTL)
+        if results:
+            pipe.execute()
+        return results
+
     def delete_shared_paper(self, paper_id: str) -> None:
         """
         删除共享试题缓存